@@ -1,46 +1,225 @@
 import ifm3dpy
 import sys
+import time
+from contextlib import contextmanager
+from .camera_config import apply_config
+
+# Images that can be streamed, with their ifm3dpy schema mask.
+SCHEMAS = {
+    "amplitude": "IMG_AMP",
+    "distance": "IMG_RDIS",
+    "xyz": "IMG_CART",
+    "unit_vectors": "IMG_UVEC",
+    "gray": "IMG_GRAY",
+}
+
+DEFAULT_SCHEMA = ("distance", "amplitude")
+
+DEADLINE_MS = 5000 #total time to get a frame
+WAIT_MS = 1000 #longest single wait for a frame
+MAX_CLOCK_OFFSET = 2.0 #s, a camera timestamp further from the computer's clock is not used
 
 class Camera:
-    def __init__(self, ip=ifm3dpy.DEFAULT_IP):
+    def __init__(self, ip=ifm3dpy.DEFAULT_IP, config=None, schema=DEFAULT_SCHEMA, deadline_ms=DEADLINE_MS):
         """
         Create the camera object.
 
-        With RDIS and AMP to get Distance or Amplitude image.
+        By default with RDIS and AMP to get Distance or Amplitude image.
         
         Parameters
         ----------
         ip : str
             Camera's IP.
+        config : CameraConfig or str
+            Acquisition parameters, or the name of a preset ("low-latency", "high-accuracy").
+            None to keep the parameters of the camera.
+        schema : int, str or tuple of str
+            Images to stream. An ifm3dpy mask, or names of SCHEMAS. e.g "amplitude" or ("distance", "amplitude")
+        deadline_ms : int
+            Default total time to get a frame, in milliseconds.
         """
+        self.ip = ip
+        self.deadline_ms = deadline_ms
+        self.frames = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.frame_time = None #time of the last frame, in seconds since the epoch
         self.cam = ifm3dpy.Camera(ip)
+        if config is not None:
+            self.configure(config)
+        self.schema = self.__mask(schema)
         try:
-            self.fg = ifm3dpy.FrameGrabber(self.cam, ifm3dpy.IMG_RDIS |ifm3dpy.IMG_AMP)
+            self.fg = ifm3dpy.FrameGrabber(self.cam, self.schema)
         except RuntimeError as e:
             print(e)
             sys.exit() 
         self.im = ifm3dpy.ImageBuffer()
 
-    def get_image(self):
+    def set_schema(self, schema):
+        """
+        Change the streamed images.
+
+        The frame grabber is only reset if the images are different : it keeps its connection to the camera.\n
+        e.g stream only the amplitude while no object is seen, then add the distance to measure it.
+
+        Parameters
+        ----------
+        schema : int, str or tuple of str
+            Images to stream. An ifm3dpy mask, or names of SCHEMAS.
+
+        Returns
+        -------
+        previous : int
+            The previous mask.
+        """
+        previous = self.schema
+        mask = self.__mask(schema)
+        if mask != previous:
+            self.fg.reset(self.cam, mask)
+            self.schema = mask
+        return previous
+
+    @contextmanager
+    def use_schema(self, schema):
+        """
+        Stream other images in a with block, then go back to the previous ones.
+
+        Parameters
+        ----------
+        schema : int, str or tuple of str
+            Images to stream. An ifm3dpy mask, or names of SCHEMAS.
+        """
+        previous = self.set_schema(schema)
+        try:
+            yield self
+        finally:
+            self.set_schema(previous)
+
+    def __mask(self, schema):
+        """
+        Get the ifm3dpy mask of a schema.
+
+        Parameters
+        ----------
+        schema : int, str or tuple of str
+            An ifm3dpy mask, or names of SCHEMAS.
+
+        Returns
+        -------
+        mask : int
+            The ifm3dpy mask.
+        """
+        if isinstance(schema, int):
+            return schema
+        if isinstance(schema, str):
+            schema = (schema,)
+        mask = 0
+        for name in schema:
+            mask |= getattr(ifm3dpy, SCHEMAS[name])
+        return mask
+
+    def configure(self, config):
+        """
+        Change the acquisition parameters.
+
+        Only the parameters that are different on the camera are sent.
+        They are kept, so a reconnection with the same configuration does not send them again.
+
+        Parameters
+        ----------
+        config : CameraConfig or str
+            Acquisition parameters, or the name of a preset.
+
+        Returns
+        -------
+        changes : dict
+            The parameters sent to the camera.
+        """
+        return apply_config(self.cam, config, self.ip)
+
+    def get_image(self, deadline_ms=None, poll=False, freshest_ms=None):
         """
         Get the image from the camera
 
-        Takes a picture.
+        Takes a picture.\n
+        Its time is kept in `frame_time` : the camera's timestamp of the frame, so the acquisition and the transfer
+        are counted in the latency. Or the reception time, if the camera gives none.\n
+        The counters `frames`, `retries` (waits without frame) and `timeouts` (no frame before the deadline) are updated.
+
+        Parameters
+        ----------
+        deadline_ms : int
+            Total time to get a frame, in milliseconds. None to use the camera's deadline.
+        poll : bool
+            If True, don't wait : return the frame if one is ready, else None.
+        freshest_ms : int
+            If given, keep taking the newest frame during this time, in milliseconds, and return the last one.
+            If no frame came during this time, wait for the first one until the deadline.
 
         Returns
         -------
         im : ifm3dpy.ImageBuffer
-            The picture.
+            The picture. Or None if `poll` is True and no frame is ready.
         
         Raises
         ------
         RuntimeError
-            If it can not get a frame.
+            If it can not get a frame before the deadline.
         """
-        nb_try = 5
-        for i in range(nb_try):
-            if self.fg.wait_for_frame(self.im, 1000):
+        if poll:
+            if self.fg.wait_for_frame(self.im, 1): #0 would wait forever
+                self.frames += 1
+                self.frame_time = self.__frame_time(time.time())
+                return self.im
+            return None
+        if deadline_ms is None:
+            deadline_ms = self.deadline_ms
+        start = time.monotonic()
+        deadline = start + deadline_ms/1000
+        freshest_end = start + (freshest_ms or 0)/1000
+        got_frame = False
+        while True:
+            now = time.monotonic()
+            end = freshest_end if got_frame else max(deadline, freshest_end)
+            remaining = int((end-now)*1000)
+            if remaining < 1:
                 break
-        if(i == nb_try-1):
+            if self.fg.wait_for_frame(self.im, min(remaining, WAIT_MS)):
+                received = time.time()
+                got_frame = True
+                if time.monotonic() >= freshest_end:
+                    break
+            elif not got_frame:
+                self.retries += 1
+        if not got_frame:
+            self.timeouts += 1
             raise RuntimeError('Timeout waiting for camera!')
+        self.frames += 1
+        self.frame_time = self.__frame_time(received)
         return self.im
+
+    def __frame_time(self, received):
+        """
+        Get the time of the frame in the buffer.
+
+        Parameters
+        ----------
+        received : float
+            Time of the reception, in seconds since the epoch.
+
+        Returns
+        -------
+        frame_time : float
+            The camera's timestamp of the frame, in seconds since the epoch.
+            The reception time if the camera gives none, or if its clock is not set like the computer's.
+        """
+        try:
+            stamp = self.im.timestamp()
+        except (AttributeError, RuntimeError):
+            return received
+        if not hasattr(stamp, "timestamp"): #not a datetime
+            return received
+        stamp = stamp.timestamp()
+        if abs(stamp-received) > MAX_CLOCK_OFFSET:
+            return received
+        return stamp
@@ -0,0 +1,20 @@
+"""
+Recognize shapes with an IFM O3X101 camera, get their sizes and grab them with an UR3 robot.
+
+The submodules are loaded at their first use. Only Camera needs ifm3dpy, and only gui needs tkinter,
+so the offline processing (shape_recognition, shape_size, ...) can be used without them.
+"""
+import importlib
+
+__all__ = ["Camera", "Shape", "benchmark", "cache", "camera_config", "classification", "conveyor", "daemon",
+           "depth_average", "detection", "execution", "features", "gui", "main", "preprocessing", "pubsub", "pyramid",
+           "recorder", "robot_state", "serialization", "settings", "soak", "shape_recognition", "shape_size", "tracing",
+           "tuner", "ur3"]
+
+def __getattr__(name):
+    """
+    Import a submodule when it's first used.
+    """
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
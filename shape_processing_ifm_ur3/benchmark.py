@@ -0,0 +1,406 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+import cv2
+import numpy as np
+from .Shape import Shape
+from .shape_recognition import detect
+from .shape_size import shape_size
+from .preprocessing import to_gray
+from .ur3 import object_position, build_program, Robot
+from . import tracing
+
+STAGES = ["acquisition", "recognition", "sizing", "transform", "emission", "send"]
+PERCENTILES = [50, 95, 99]
+
+CALIBRATION = {'Top Left': ['211', '-397'], 'Top Right': ['-75', '-307'], 'Bottom Left': ['211', '-166'],
+               'Bottom Right': ['-75', '-166'], 'Z': ['40']}
+
+class SyntheticImage:
+    """
+    A frame of SyntheticCamera, with the same methods as ifm3dpy.ImageBuffer.
+    """
+    def __init__(self, amplitude, distance):
+        """
+        Create the frame.
+
+        Parameters
+        ----------
+        amplitude : numpy.ndarray
+            The amplitude image.
+        distance : numpy.ndarray
+            The distance image.
+        """
+        self.amplitude = amplitude
+        self.distance = distance
+
+    def amplitude_image(self):
+        """
+        Get the amplitude image.
+        """
+        return self.amplitude
+
+    def distance_image(self):
+        """
+        Get the distance image.
+        """
+        return self.distance
+
+class SyntheticCamera:
+    """
+    Camera without hardware, with the same get_image as Camera.
+
+    The frames are replayed from a recording, or drawn at the creation : getting a frame costs nothing.
+    """
+    def __init__(self, replay=None, nb_frames=16, height=172, width=224, seed=0):
+        """
+        Create the frames.
+
+        Parameters
+        ----------
+        replay : str
+            Path of a recording : a ring file of FlightRecorder, or a .npz file of its export.
+            None to draw synthetic scenes.
+        nb_frames : int
+            Number of synthetic scenes.
+        height : int
+            Image's height of the synthetic scenes.
+        width : int
+            Image's width of the synthetic scenes.
+        seed : int
+            Seed of the synthetic scenes.
+        """
+        if replay is not None:
+            if replay.endswith(".npz"):
+                frames = np.load(replay)
+            else:
+                from .recorder import read_ring
+                frames = read_ring(replay)
+            self.images = [SyntheticImage(a, d) for a, d in zip(frames["amplitude"], frames["distance"])]
+            if not self.images:
+                raise ValueError("The recording has no frame : " + replay)
+        else:
+            rng = np.random.default_rng(seed)
+            self.images = [SyntheticImage(*synthetic_scene(rng, height, width)) for _ in range(nb_frames)]
+        self.frames = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.frame_time = None
+
+    def get_image(self):
+        """
+        Get the next frame.
+
+        Returns
+        -------
+        im : SyntheticImage
+            The frame.
+        """
+        im = self.images[self.frames % len(self.images)]
+        self.frames += 1
+        self.frame_time = time.time()
+        return im
+
+class FakeRobot:
+    """
+    Local TCP endpoint that accepts programs like the robot.
+
+    Like the robot, it sends its state on the connection, and it ignores the programs.
+    """
+    def __init__(self, host="127.0.0.1", port=0, state_size=1024, state_period=0.1):
+        """
+        Open the endpoint.
+
+        Parameters
+        ----------
+        host : str
+            Address to listen on.
+        port : int
+            Port to listen on. 0 to choose a free port.
+        state_size : int
+            Size of a state message, in bytes.
+        state_period : float
+            Time between two state messages, in seconds.
+        """
+        self.received = 0
+        self.connections = 0
+        self.state_size = state_size
+        self.state_period = state_period
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind((host, port))
+        self.__server.listen()
+        self.address = self.__server.getsockname()
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def close(self):
+        """
+        Close the endpoint.
+        """
+        self.__server.close()
+
+    def __accept(self):
+        """
+        Accept the connections.
+        """
+        while True:
+            try:
+                conn, _ = self.__server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.__receive, args=(conn,), daemon=True).start()
+
+    def __receive(self, conn):
+        """
+        Read the programs and send the state.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            Connection to the client.
+        """
+        state = bytes(self.state_size)
+        conn.settimeout(self.state_period)
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(65536)
+                    if not data:
+                        return
+                    self.received += len(data)
+                except socket.timeout:
+                    try:
+                        conn.sendall(state)
+                    except OSError:
+                        return
+                except OSError:
+                    return
+
+def synthetic_scene(rng, height=172, width=224):
+    """
+    Draw a scene with a few shapes at random places.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        Random generator.
+    height : int
+        Image's height
+    width : int
+        Image's width
+
+    Returns
+    -------
+    amplitude : numpy.ndarray
+        The amplitude image, as uint16 like the camera.
+    distance : numpy.ndarray
+        The distance image, in meters. The floor is at 1 m, the shapes are 5 to 10 cm high.
+    """
+    img = np.full((height, width), 40, np.uint8)
+    dist = np.full((height, width), 1.0, np.float32)
+    mask = np.zeros((height, width), np.uint8)
+    cx, cy = width//2 + rng.integers(-20, 20), height//2 + rng.integers(-20, 20)
+    box = cv2.boxPoints(((int(cx), int(cy)), (int(rng.integers(40, 60)), int(rng.integers(20, 30))),
+                         float(rng.uniform(0, 90)))).astype(np.int32)
+    cv2.fillPoly(img, [box], 210)
+    cv2.fillPoly(mask, [box], 255)
+    dist[mask > 0] = 1.0 - rng.uniform(0.05, 0.1)
+    cv2.circle(img, (int(rng.integers(25, 60)), int(rng.integers(25, 50))), int(rng.integers(12, 20)), 220, -1)
+    triangle = np.array([[30, 150], [55, 110], [80, 150]], np.int32) + rng.integers(-5, 5, 2).astype(np.int32)
+    cv2.fillPoly(img, [triangle], 180)
+    img = cv2.add(img, rng.integers(0, 15, (height, width), dtype=np.uint8))
+    return img.astype(np.uint16) << 8, dist
+
+def run(cycles=1000, camera=None, robot=None, shape=Shape.RECTANGLE, calibration=CALIBRATION, warm_up=20,
+        tiles=None):
+    """
+    Run pick cycles like main : frame, recognition, sizing, coordinate transform, program and send.
+
+    Parameters
+    ----------
+    cycles : int
+        Number of measured cycles.
+    camera : Camera
+        The camera. None for a SyntheticCamera.
+    robot : Robot
+        Connection to the robot. None for a FakeRobot.
+    shape : Shape
+        Shape to pick.
+    calibration : dict
+        Positions of the robot on the image.
+    warm_up : int
+        Number of cycles run before the measure.
+    tiles : tuple of int
+        Number of rows and columns of tiles of the preprocessing. None to process the whole image at once.
+
+    Returns
+    -------
+    times : numpy.ndarray
+        Time of each stage (STAGES) of each cycle, in seconds. Shape (cycles, len(STAGES)).
+        NaN for the stages not run : the shape was not found.
+    elapsed : float
+        Total time, in seconds.
+    found : int
+        Number of cycles where the shape was found.
+    """
+    fake = None
+    if camera is None:
+        camera = SyntheticCamera()
+    if robot is None:
+        fake = FakeRobot()
+        robot = Robot(*fake.address)
+    times = np.zeros((cycles, len(STAGES)))
+    found = 0
+    clock = time.perf_counter
+    try:
+        for i in range(-warm_up, cycles):
+            if i == 0:
+                start = clock()
+            with tracing.frame(i):
+                t0 = clock()
+                with tracing.span("grab"):
+                    im = camera.get_image()
+                t1 = clock()
+                detection = detect(shape, to_gray(im.amplitude_image()), tiles=tiles)
+                t2 = clock()
+                if detection.index is None:
+                    if i >= 0:
+                        times[i] = (t1-t0, t2-t1, np.nan, np.nan, np.nan, np.nan)
+                    continue
+                features = detection.features
+                height, length, width = shape_size(features if features is not None else detection.contour,
+                                                   im.distance_image())
+                t3 = clock()
+                img_height, img_width = detection.image.shape
+                with tracing.span("transform"):
+                    x, y = object_position(calibration, img_width, img_height, detection.center)
+                t4 = clock()
+                with tracing.span("program"):
+                    program = build_program(calibration, x, y, height, detection.angle)
+                t5 = clock()
+                with tracing.span("send"):
+                    robot.send(program)
+                t6 = clock()
+            if i >= 0:
+                times[i] = (t1-t0, t2-t1, t3-t2, t4-t3, t5-t4, t6-t5)
+                found += 1
+        elapsed = clock() - start
+    finally:
+        if fake is not None:
+            robot.close()
+            fake.close()
+    return times, elapsed, found
+
+def report(times, elapsed, found):
+    """
+    Get the latency percentiles and the throughput.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        Time of each stage of each cycle, given by run.
+    elapsed : float
+        Total time, in seconds.
+    found : int
+        Number of cycles where the shape was found.
+
+    Returns
+    -------
+    result : dict
+        Percentiles (PERCENTILES), mean and max of each stage and of the total, in milliseconds.
+        A stage is measured on the cycles that ran it, the total on the cycles where the shape was found.
+        Cycles per second, the number of cycles where the shape was not found, and the versions,
+        to compare the results.
+    """
+    ms = times*1000
+    complete = ~np.isnan(ms).any(axis=1)
+    result = {"cycles": len(times), "found": found, "not_found": len(times)-found,
+              "cycles_per_second": len(times)/elapsed if elapsed > 0 else None,
+              "stages": {}, "versions": __versions()}
+    for name, values in zip(STAGES + ["total"], list(ms.T) + [ms[complete].sum(axis=1)]):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            continue
+        stats = {"p" + str(p): float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+        stats["mean"] = float(values.mean())
+        stats["max"] = float(values.max())
+        result["stages"][name] = stats
+    return result
+
+def compare(old, new):
+    """
+    Print the latencies of two results side by side.
+
+    Parameters
+    ----------
+    old : dict
+        The reference result, given by report.
+    new : dict
+        The new result.
+    """
+    print("{:<12} {:>6} {:>10} {:>10} {:>8}".format("stage", "", "old ms", "new ms", "ratio"))
+    for name, stats in new["stages"].items():
+        if name not in old["stages"]:
+            continue
+        for key in ("p" + str(p) for p in PERCENTILES):
+            before, after = old["stages"][name][key], stats[key]
+            ratio = after/before if before else float("nan")
+            print("{:<12} {:>6} {:>10.3f} {:>10.3f} {:>8.2f}".format(name, key, before, after, ratio))
+    print("cycles/s : {:.1f} -> {:.1f}".format(old["cycles_per_second"], new["cycles_per_second"]))
+
+def __versions():
+    """
+    Get the versions of the code and of the libraries.
+
+    Returns
+    -------
+    versions : dict
+        Git commit (None if unknown), Python, NumPy and OpenCV versions.
+    """
+    try:
+        commit = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "opencv": cv2.__version__}
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="End-to-end pick cycle benchmark, with a synthetic camera and a fake robot.")
+    parser.add_argument("-n", "--cycles", type=int, default=2000, help="Number of measured cycles.")
+    parser.add_argument("--warm-up", type=int, default=20, help="Number of cycles before the measure.")
+    parser.add_argument("--replay", default=None, help="Recording to replay (ring file or .npz export) instead of synthetic scenes.")
+    parser.add_argument("--shape", default=Shape.RECTANGLE.name, choices=list(Shape.__members__), help="Shape to pick.")
+    parser.add_argument("--tiles", default=None, help="Tiles of the preprocessing, rows x columns. e.g 2x2")
+    parser.add_argument("-o", "--output", default=None, help="Save the result in this JSON file.")
+    parser.add_argument("--trace", default=None, help="Write the spans of the last cycles in this Chrome trace file.")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous result to compare with.")
+    args = parser.parse_args()
+
+    tiles = None if args.tiles is None else tuple(int(n) for n in args.tiles.lower().split("x"))
+    if args.trace is not None:
+        tracing.enable()
+    times, elapsed, found = run(args.cycles, SyntheticCamera(args.replay), shape=Shape[args.shape], warm_up=args.warm_up,
+                                tiles=tiles)
+    result = report(times, elapsed, found)
+    print("{:<12} ".format("stage") + " ".join("{:>8}".format("p" + str(p)) for p in PERCENTILES) + " (ms)")
+    for name, stats in result["stages"].items():
+        print("{:<12} ".format(name) + " ".join("{:>8.3f}".format(stats["p" + str(p)]) for p in PERCENTILES))
+    print("Found : ", found, "/", len(times), "(not found : " + str(result["not_found"]) + ")")
+    print("Cycles per second : ", round(result["cycles_per_second"], 1))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    if args.trace is not None:
+        tracing.export(args.trace)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+    sys.exit(0)
@@ -0,0 +1,176 @@
+import cv2
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from . import shape_recognition as recognition
+from .shape_size import shape_size
+from .features import ContourFeatures
+from .settings import get_settings
+
+class ResultCache:
+    """
+    Cache of the results of shape_recognition and shape_size.
+
+    A result is found with a hash of the frame and of the detection parameters.\n
+    The least recently used results are removed when the cache is full, and the results are removed when they are too old.\n
+    The recognition part that does not depend on the wanted shape is cached,
+    so asking for another shape on the same frame is not computed again.
+    """
+    def __init__(self, max_size=32, max_age=10.0):
+        """
+        Create an empty cache.
+
+        Parameters
+        ----------
+        max_size : int
+            Maximal number of results.
+        max_age : float
+            Maximal age of a result, in seconds. None to keep them until they are the least recently used.
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @property
+    def hit_rate(self):
+        """
+        float : Part of the requests found in the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits/total if total else 0.0
+
+    def clear(self):
+        """
+        Remove all the results and reset the counters.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def shape_recognition(self, shape, path, features=False, pyramid_levels=None, tiles=None):
+        """
+        Cached shape_recognition.
+
+        Same parameters and returns as shape_recognition.
+        """
+        return self.detect(shape, path, pyramid_levels, tiles).as_tuple(features)
+
+    def detect(self, shape, path, pyramid_levels=None, tiles=None):
+        """
+        Cached detect.
+
+        Same parameters and returns as detect. The image of the detection is a copy, so it is not modified by the next frame.
+        """
+        if pyramid_levels is None:
+            pyramid_levels = recognition.PYRAMID_LEVELS
+        if isinstance(path, str):
+            with open(path, "rb") as image_file:
+                data = image_file.read()
+            key = self.key(data, "recognition", pyramid_levels, tiles, get_settings(), recognition.MAX_CANDIDATES)
+            img = None
+        else:
+            img = path
+            key = self.key(img, "recognition", pyramid_levels, tiles, get_settings(), recognition.MAX_CANDIDATES)
+        entry = self.get(key)
+        if entry is None:
+            if img is None:
+                img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+            img, candidates, detected_list = recognition.detect_candidates(img, pyramid_levels, tiles)
+            entry = (img.copy(), candidates, detected_list)
+            self.put(key, entry)
+        return recognition.select_shape(shape, *entry)
+
+    def shape_size(self, contour, dist):
+        """
+        Cached shape_size.
+
+        Same parameters and returns as shape_size.
+        """
+        if isinstance(contour, ContourFeatures):
+            key = self.key(dist, "size", get_settings(), contour.contour, contour.approx)
+        else:
+            key = self.key(dist, "size", get_settings(), contour)
+        result = self.get(key)
+        if result is None:
+            result = shape_size(contour, dist)
+            self.put(key, result)
+        return result
+
+    def key(self, frame, *params):
+        """
+        Hash a frame and its parameters.
+
+        Parameters
+        ----------
+        frame : bytes or numpy.ndarray
+            The frame.
+        params
+            Parameters of the computation. Arrays are hashed with their content.
+
+        Returns
+        -------
+        key : bytes
+            The key of the result.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for value in (frame,) + params:
+            if isinstance(value, np.ndarray):
+                digest.update(repr((value.shape, value.dtype.str)).encode())
+                digest.update(np.ascontiguousarray(value).data)
+            elif isinstance(value, bytes):
+                digest.update(value)
+            else:
+                digest.update(repr(value).encode())
+            digest.update(b"|")
+        return digest.digest()
+
+    def get(self, key):
+        """
+        Get a result.
+
+        Parameters
+        ----------
+        key : bytes
+            The key of the result.
+
+        Returns
+        -------
+        result
+            The result. Or None if it's not in the cache or too old.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.max_age is not None and time.monotonic()-entry[0] > self.max_age:
+                del self.__entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, result):
+        """
+        Add a result.
+
+        The least recently used result is removed if the cache is full.
+
+        Parameters
+        ----------
+        key : bytes
+            The key of the result.
+        result
+            The result.
+        """
+        with self.__lock:
+            self.__entries[key] = (time.monotonic(), result)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
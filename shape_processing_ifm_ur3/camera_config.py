@@ -0,0 +1,171 @@
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass(frozen=True)
+class CameraConfig:
+    """
+    Acquisition parameters of the camera.
+
+    Each field is a parameter of the active application's imager in the ifm3d JSON.
+    A field set to None is not changed on the camera.
+    """
+    frame_rate: Optional[float] = None
+    exposure_time: Optional[int] = None
+    imager_type: Optional[str] = None
+    spatial_filter: Optional[int] = None
+    temporal_filter: Optional[int] = None
+
+    def to_params(self):
+        """
+        Get the ifm3d JSON parameters.
+
+        Returns
+        -------
+        params : dict
+            The imager parameters, as strings like in the ifm3d JSON. e.g {'FrameRate': '20'}
+        """
+        params = {}
+        for field, key in JSON_KEYS.items():
+            value = getattr(self, field)
+            if value is None:
+                continue
+            if isinstance(value, float) and value.is_integer():
+                value = int(value) #like in the ifm3d JSON
+            params[key] = str(value)
+        return params
+
+JSON_KEYS = {
+    "frame_rate": "FrameRate",
+    "exposure_time": "ExposureTime",
+    "imager_type": "Type",
+    "spatial_filter": "SpatialFilterType",     # 0 : off, 1 : median, 2 : mean, 3 : bilateral
+    "temporal_filter": "TemporalFilterType",   # 0 : off, 1 : mean, 2 : adaptive exponential
+}
+
+PRESETS = {
+    "low-latency": CameraConfig(frame_rate=40, exposure_time=400, imager_type="under5m_low",
+                                spatial_filter=0, temporal_filter=0),
+    "high-accuracy": CameraConfig(frame_rate=10, exposure_time=1000, imager_type="under5m_high",
+                                  spatial_filter=1, temporal_filter=2),
+}
+
+__applied = {}
+
+def apply_config(cam, config, key=None):
+    """
+    Apply a configuration to the camera.
+
+    Only the parameters that are different on the camera are sent.\n
+    The parameters of the camera are kept, so if the same configuration is applied again
+    (e.g after a reconnection), the camera is neither read nor written.
+
+    Parameters
+    ----------
+    cam : ifm3dpy.Camera
+        The camera.
+    config : CameraConfig or str
+        The configuration, or the name of a preset.
+    key : str
+        Name of the camera for the cache, e.g its IP. None to not use the cache.
+
+    Returns
+    -------
+    changes : dict
+        The parameters sent to the camera.
+    """
+    if isinstance(config, str):
+        config = PRESETS[config]
+    params = config.to_params()
+    cached = __applied.get(key)
+    if cached is not None and not diff(params, cached):
+        return {}
+    index, imager = __active_imager(cam.to_json())
+    changes = diff(params, imager)
+    if changes:
+        cam.from_json({"ifm3d": {"Apps": [{"Index": index, "Imager": changes}]}})
+    imager.update(changes)
+    if key is not None:
+        __applied[key] = imager
+    return changes
+
+def forget(key=None):
+    """
+    Forget the parameters kept for a camera, e.g if they were changed by another tool.
+
+    Parameters
+    ----------
+    key : str
+        Name of the camera. None to forget all the cameras.
+    """
+    if key is None:
+        __applied.clear()
+    else:
+        __applied.pop(key, None)
+
+def diff(params, current):
+    """
+    Get the parameters that are different.
+
+    Parameters
+    ----------
+    params : dict
+        The wanted parameters.
+    current : dict
+        The parameters of the camera.
+
+    Returns
+    -------
+    changes : dict
+        The wanted parameters that are different on the camera.
+    """
+    return {key: value for key, value in params.items() if not __same(current.get(key), value)}
+
+def __active_imager(config):
+    """
+    Get the imager parameters of the active application.
+
+    Parameters
+    ----------
+    config : dict or str
+        The ifm3d JSON of the camera.
+
+    Returns
+    -------
+    index : str
+        Index of the active application.
+    imager : dict
+        Its imager parameters.
+    """
+    if isinstance(config, str):
+        config = json.loads(config)
+    ifm3d = config["ifm3d"]
+    apps = ifm3d["Apps"]
+    index = ifm3d.get("Device", {}).get("ActiveApplication", apps[0].get("Index", "1"))
+    for app in apps:
+        if str(app.get("Index")) == str(index):
+            return str(index), dict(app["Imager"])
+    return str(index), dict(apps[0]["Imager"])
+
+def __same(current, wanted):
+    """
+    Compare a value of the camera with a wanted value.
+
+    Parameters
+    ----------
+    current : str
+        The value of the camera. None if unknown.
+    wanted : str
+        The wanted value.
+
+    Returns
+    -------
+    same : bool
+        True if the values are equal, as numbers or as strings.
+    """
+    if current is None:
+        return False
+    try:
+        return float(current) == float(wanted)
+    except ValueError:
+        return str(current) == wanted
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+from math import pi
+from .Shape import Shape
+from .settings import get_settings
+
+def classify(features_list, width, height):
+    """
+    Detects the type of all the shapes at once.
+
+    The measures of every contour are gathered in arrays,
+    then the shapes are decided with masks instead of one contour at a time.
+
+    Parameters
+    ----------
+    features_list : list of ContourFeatures
+        Geometry of the shapes.
+    width : int
+        Image's width
+    height : int
+        Image's height
+
+    Returns
+    -------
+    detected : numpy.ndarray
+        The detected shape (Shape value) of each contour.
+    """
+    nb = len(features_list)
+    detected = np.full(nb, Shape.UNKNOW.value, np.int64)
+    if nb == 0:
+        return detected
+    area = np.fromiter((f.area for f in features_list), np.float64, nb)
+    edges = np.fromiter((len(f.approx) for f in features_list), np.int64, nb)
+    bounding = np.array([cv2.boundingRect(f.approx) for f in features_list], np.int64).reshape(nb, 4)
+    radius = np.fromiter((f.enclosing_circle[1] for f in features_list), np.float64, nb)
+
+    partial = __partial_mask(bounding, width, height)
+    #calcul the area of the circle added over the shape to detect if it's a circle
+    circle_fill = (pi*((radius-get_settings().circle_margin)**2)) <= area
+    circle = ~partial & circle_fill
+    other = ~partial & ~circle
+
+    detected[partial] = Shape.PARTIAL.value
+    detected[circle] = Shape.CIRCLE.value
+    detected[other & (edges == 3)] = Shape.TRIANGLE.value
+
+    quad = np.flatnonzero(other & (edges == 4))
+    if quad.size:
+        detected[quad] = __square_or_rectangle([features_list[i] for i in quad])
+
+    more = np.flatnonzero(other & (edges >= 5))
+    if more.size:
+        detected[more] = __more_5_edge_shape([features_list[i] for i in more], area[more], edges[more])
+    return detected
+
+def __partial_mask(bounding, width, height):
+    """
+    Check which shapes are partial.
+
+    It's a partial shape if the shape's contours is on the image's edges.
+    It's tested with the bounding box of the approximated polygon.
+
+    Parameters
+    ----------
+    bounding : numpy.ndarray
+        Bounding boxes (x, y, width, height), one row per shape.
+    width : int
+        Image's width
+    height : int
+        Image's height
+
+    Returns
+    -------
+    partial : numpy.ndarray
+        True for the partial shapes.
+    """
+    x_min = bounding[:,0]
+    y_min = bounding[:,1]
+    x_max = x_min + bounding[:,2] - 1
+    y_max = y_min + bounding[:,3] - 1
+    # The shape is on the image's edges if a point is less than 1 or more than width-1,
+    # or if a Y position is height or height-1.
+    return (x_min <= 1) | (y_min <= 1) | (x_max >= width-1) | (y_max >= min(width, height)-1)
+
+def __square_or_rectangle(features_list):
+    """
+    Detects if the shapes are squares or rectangles.
+
+    If the ratio between the width and the height is almost 1, it's a square.
+
+    Parameters
+    ----------
+    features_list : list of ContourFeatures
+        Geometry of the 4 edges shapes.
+
+    Returns
+    -------
+    detected : numpy.ndarray
+        The detected shapes
+    """
+    nb = len(features_list)
+    size = np.array([f.min_area_rect[1] for f in features_list], np.float64).reshape(nb, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        aspect_ratio = size[:,0]/size[:,1]
+    tolerance = get_settings().square_tolerance
+    square = (aspect_ratio >= 1-tolerance) & (aspect_ratio <= 1+tolerance) #It's a square if the ratio height, width is +- 1
+    return np.where(square, Shape.SQUARE.value, Shape.RECTANGLE.value)
+
+def __more_5_edge_shape(features_list, area, edges):
+    """
+    Detects shapes with more than 5 edges.
+
+    Parameters
+    ----------
+    features_list : list of ContourFeatures
+        Geometry of the shapes.
+    area : numpy.ndarray
+        Area of the shapes.
+    edges : numpy.ndarray
+        Number of edges of the shapes.
+
+    Returns
+    -------
+    detected : numpy.ndarray
+        The detected shapes
+    """
+    nb = len(features_list)
+    axes = np.array([f.ellipse[1] for f in features_list], np.float64).reshape(nb, 2)/2
+    #calcul the area of the ellipse added over the shape to detect if it's a ellipse
+    ellipse_fill = (pi*axes[:,0]*axes[:,1])-get_settings().ellipse_margin <= area
+    detected = np.full(nb, Shape.UNKNOW.value, np.int64)
+    detected[edges == 5] = Shape.PENTAGON.value
+    detected[edges == 6] = Shape.HEXAGON.value
+    detected[edges == 7] = Shape.HEPTAGON.value
+    detected[edges == 8] = Shape.OCTAGON.value
+    detected[ellipse_fill] = Shape.ELLIPSE.value
+    return detected
@@ -0,0 +1,138 @@
+import time
+import numpy as np
+
+HISTORY = 5 #positions used to estimate the velocity
+MAX_DISTANCE = 50 #mm, farther from the predicted position it's another object
+ROBOT_LATENCY = 0.0 #s, from the program sent to the grasp. To measure on the cell.
+
+class ConveyorTracker:
+    """
+    Predict where an object on a conveyor will be when the robot grasps it.
+
+    The velocity is given (the conveyor's speed), or estimated by following the object on the last frames.\n
+    The positions are the robot's positions given by ur3.object_position, in mm.
+    The latency is the time from the frame to the grasp : the processing, then the robot's latency.
+    """
+    def __init__(self, velocity=None, robot_latency=ROBOT_LATENCY, history=HISTORY, max_distance=MAX_DISTANCE):
+        """
+        Create the tracker.
+
+        Parameters
+        ----------
+        velocity : tuple of float
+            Conveyor's velocity (x, y) in the robot's frame, in mm/s. None to estimate it by tracking.
+        robot_latency : float
+            Time from the program sent to the grasp, in seconds.
+        history : int
+            Number of positions used to estimate the velocity.
+        max_distance : float
+            Largest distance between the predicted position and the new one, in mm. Farther, it's another object.
+        """
+        self.conveyor_velocity = velocity
+        self.robot_latency = robot_latency
+        self.history = history
+        self.max_distance = max_distance
+        self.lost = 0
+        self.__positions = []
+        self.__timestamps = []
+        self.__velocity = None
+
+    @property
+    def velocity(self):
+        """
+        tuple of float : Object's velocity (x, y), in mm/s. None if it's unknown.
+        """
+        if self.conveyor_velocity is not None:
+            return tuple(self.conveyor_velocity)
+        return self.__velocity
+
+    @property
+    def tracking(self):
+        """
+        bool : True if the velocity is estimated by tracking.
+        """
+        return self.conveyor_velocity is None
+
+    def update(self, position, timestamp):
+        """
+        Add the position of the object on a new frame.
+
+        If it's too far from the predicted position, it's another object and the tracking starts again.
+
+        Parameters
+        ----------
+        position : tuple of float
+            Robot's position (x, y) of the object, in mm.
+        timestamp : float
+            Time of the frame, in seconds.
+
+        Returns
+        -------
+        velocity : tuple of float
+            Object's velocity, in mm/s. None if it's unknown.
+        """
+        if self.__positions:
+            expected = self.predict(self.__positions[-1], self.__timestamps[-1], timestamp)
+            if np.hypot(position[0]-expected[0], position[1]-expected[1]) > self.max_distance:
+                self.lost += 1
+                self.reset()
+        self.__positions.append((float(position[0]), float(position[1])))
+        self.__timestamps.append(float(timestamp))
+        del self.__positions[:-self.history]
+        del self.__timestamps[:-self.history]
+        self.__velocity = self.__estimate()
+        return self.velocity
+
+    def reset(self):
+        """
+        Forget the followed object.
+        """
+        self.__positions.clear()
+        self.__timestamps.clear()
+        self.__velocity = None
+
+    def predict(self, position, timestamp, at=None):
+        """
+        Predict the position of the object.
+
+        Parameters
+        ----------
+        position : tuple of float
+            Robot's position (x, y) of the object on the frame, in mm.
+        timestamp : float
+            Time of the frame, in seconds.
+        at : float
+            Time of the prediction, in seconds. None for the grasp : now, plus the robot's latency.
+
+        Returns
+        -------
+        position : tuple of float
+            Predicted position (x, y), in mm. The same position if the velocity is unknown.
+        """
+        if at is None:
+            at = time.time() + self.robot_latency
+        velocity = self.velocity
+        if velocity is None:
+            return position[0], position[1]
+        latency = at - timestamp
+        return position[0] + velocity[0]*latency, position[1] + velocity[1]*latency
+
+    def __estimate(self):
+        """
+        Estimate the velocity, with a least squares fit of the positions.
+
+        Returns
+        -------
+        velocity : tuple of float
+            Object's velocity, in mm/s. None if there are less than 2 frames.
+        """
+        if len(self.__timestamps) < 2:
+            return None
+        t = np.array(self.__timestamps)
+        positions = np.array(self.__positions)
+        t -= t.mean()
+        denominator = np.dot(t, t)
+        if denominator == 0:
+            return None
+        velocity = np.dot(t, positions - positions.mean(axis=0)) / denominator
+        return float(velocity[0]), float(velocity[1])
@@ -0,0 +1,640 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+from .Shape import Shape
+from .shape_recognition import detect
+from .shape_size import shape_size
+from .preprocessing import to_gray
+from .ur3 import get_object, object_position, Robot
+from .conveyor import ConveyorTracker
+from .execution import ExecutionManager, PORT as NOTIFY_PORT
+from . import tracing
+from .settings import SettingsFile, get_settings
+from .depth_average import DepthAccumulator
+from .serialization import encode
+from .cache import ResultCache
+
+HOST = "127.0.0.1"
+PORT = 30020
+CALIBRATION = "calibration.json"
+RETRY_DELAY = 0.1 #s, between two pictures of a run when nothing is found
+RECORD_SLOTS = 300 #frames kept by the flight recorder
+
+class PickDaemon:
+    """
+    Pick-cell service. The camera, the robot connection, the calibration and the processing buffers stay ready
+    between the picks.
+
+    The picks are asked on a local control socket, one command per line :\n
+    PICK [SHAPE] : take a picture, detect the shape and grab it. e.g PICK CIRCLE\n
+    RUN [SHAPE] : pick continuously, with an execution manager.\n
+    STOP : stop picking continuously.\n
+    TRACE PATH : write the recorded spans to a Chrome trace file. The tracing is enabled with tracing.enable.\n
+    RELOAD : reload the settings file now.\n
+    HEALTH : get the state of the service.\n
+    SHUTDOWN : stop the service, after the current pick.\n
+    Each command gets one JSON line as answer.
+    """
+    def __init__(self, camera=None, robot=None, calibration=CALIBRATION, shape=Shape.RECTANGLE,
+                 host=HOST, port=PORT, publisher=None, tracker=None, manager=None, settings=None, record=None,
+                 record_slots=RECORD_SLOTS, export=None, cache=None):
+        """
+        Create the service. Nothing is started before start.
+
+        Parameters
+        ----------
+        camera : Camera
+            The camera. None to connect to the default camera at start.
+        robot : Robot
+            Connection to the robot. None for the default robot.
+        calibration : dict or str
+            Positions of the robot on the image, or the path of their JSON file.
+            If the file doesn't exist, the positions are asked with the GUI, then saved.
+        shape : Shape
+            Shape to pick when PICK has no shape.
+        host : str
+            Address of the control socket.
+        port : int
+            Port of the control socket. 0 to choose a free port.
+        publisher : ResultPublisher
+            If given, the result of each pick is published to its subscribers.
+        tracker : ConveyorTracker
+            If given, the objects move on a conveyor : each one is taken where it will be at the grasp.
+            If the tracker estimates the velocity, frames are taken until it's known.
+        manager : ExecutionManager
+            If given, the programs are queued in it, and its robot is used.
+            It allows RUN : each picture is taken as soon as the arm is cleared.
+        settings : SettingsFile
+            If given, the file is checked before each pick. Its changes apply from the next frame,
+            without closing the camera and the robot connections.
+        record : str
+            Path of the flight recorder's ring file. Each frame of the picks is recorded with its result.
+            None to record nothing.
+        record_slots : int
+            Number of frames kept by the flight recorder.
+        export : str
+            Folder of the recordings of the failed picks. None for the folder of the ring file.
+        cache : ResultCache
+            If given, the detections are cached : a frame already seen (e.g a replayed recording, or a still scene
+            retried by RUN) is not processed again. None to process each frame.
+        """
+        self.camera = camera
+        self.tracker = tracker
+        self.manager = manager
+        self.settings = settings
+        if manager is not None:
+            robot = manager.robot
+        self.robot = robot if robot is not None else Robot()
+        self.calibration = calibration
+        self.shape = shape
+        self.publisher = publisher
+        self.record = record
+        self.record_slots = record_slots
+        self.export = export
+        self.cache = cache
+        self.recorder = None #opened at the first frame, when the images' size is known
+        self.accumulator = None #average of the distance images, with depth_frames of the settings
+        self.exports = 0
+        self.last_export = None
+        self.address = (host, port)
+        self.state = "created"
+        self.picks = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_cycle_ms = None
+        self.started = None
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__running = threading.Event()
+        self.__server = None
+        self.__exported = None #sequence number of the last frame exported
+
+    def start(self):
+        """
+        Connect to the camera, load the calibration, do a warm-up pass, then open the control socket.
+        """
+        self.state = "starting"
+        self.started = time.time()
+        if self.camera is None:
+            from .Camera import Camera
+            self.camera = Camera()
+        if not isinstance(self.calibration, dict):
+            self.calibration = load_calibration(self.calibration)
+        if self.manager is not None:
+            self.manager.start()
+        self.warm_up()
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind(self.address)
+        self.__server.listen()
+        self.address = self.__server.getsockname()
+        threading.Thread(target=self.__accept, daemon=True).start()
+        self.state = "ready"
+
+    def warm_up(self):
+        """
+        Process one frame without moving the robot, and connect to the robot.
+
+        The first frame allocates the processing buffers, so the first pick is as fast as the next ones.\n
+        A failure is kept in last_error : the service starts anyway.
+        """
+        try:
+            im = self.camera.get_image()
+            detect(self.shape, to_gray(im.amplitude_image()))
+            self.robot.connect()
+        except (RuntimeError, OSError) as e:
+            print(e)
+            self.last_error = str(e)
+
+    def pick(self, shape=None):
+        """
+        Take a picture, detect the shape and grab it.
+
+        Only one pick runs at a time.
+
+        Parameters
+        ----------
+        shape : Shape
+            Shape to pick. None for the default shape.
+
+        Returns
+        -------
+        result : dict
+            ok, and the detected shape's center, angle and dimensions. Or the error.
+        """
+        if shape is None:
+            shape = self.shape
+        with self.__lock:
+            if self.__stopped.is_set():
+                return {"ok": False, "error": "The service is stopped."}
+            self.state = "picking"
+            start = time.perf_counter()
+            try:
+                if self.settings is not None:
+                    self.settings.refresh()
+                with tracing.frame(self.picks, shape=shape.name):
+                    result = self.__pick(shape)
+            except Exception as e:
+                print(e)
+                result = {"ok": False, "error": type(e).__name__ + " : " + str(e)}
+            finally:
+                self.state = "ready"
+            self.last_cycle_ms = (time.perf_counter()-start)*1000
+            self.picks += 1
+            if not result["ok"]:
+                self.failures += 1
+                self.last_error = result["error"]
+                self.__export_recording()
+        result["cycle_ms"] = self.last_cycle_ms
+        return result
+
+    def run(self, shape=None):
+        """
+        Pick continuously, until stop or shutdown.
+
+        Each picture is taken as soon as the arm is cleared. The program is built while the robot finishes
+        the previous one, and waits in the manager until it's done.
+
+        Parameters
+        ----------
+        shape : Shape
+            Shape to pick. None for the default shape.
+
+        Raises
+        ------
+        RuntimeError
+            If there's no execution manager : the programs would abort each other.
+        """
+        if self.manager is None:
+            raise RuntimeError("Picking continuously needs an execution manager.")
+        self.__running.set()
+        try:
+            while self.__running.is_set() and not self.__stopped.is_set():
+                if not self.manager.wait_ready(1):
+                    continue
+                if not self.pick(shape)["ok"]:
+                    self.__stopped.wait(RETRY_DELAY)
+        finally:
+            self.__running.clear()
+
+    def stop(self):
+        """
+        Stop picking continuously. The queued program still runs.
+        """
+        self.__running.clear()
+
+    def health(self):
+        """
+        Get the state of the service.
+
+        Returns
+        -------
+        health : dict
+            State, counters, last error and the camera's and robot's counters.
+        """
+        camera = self.camera
+        manager = self.manager
+        return {"state": self.state,
+                "running": self.__running.is_set(),
+                "uptime": None if self.started is None else time.time()-self.started,
+                "picks": self.picks,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "last_cycle_ms": self.last_cycle_ms,
+                "camera": None if camera is None else {"frames": getattr(camera, "frames", None),
+                                                       "retries": getattr(camera, "retries", None),
+                                                       "timeouts": getattr(camera, "timeouts", None)},
+                "robot": {"connected": self.robot.connected, "sent": self.robot.sent,
+                          "reconnects": self.robot.reconnects},
+                "conveyor": None if self.tracker is None else {"velocity": self.tracker.velocity,
+                                                               "lost": self.tracker.lost},
+                "settings": None if self.settings is None else {"path": self.settings.path,
+                                                                "reloads": self.settings.reloads,
+                                                                "errors": self.settings.errors,
+                                                                "last_error": self.settings.last_error},
+                "cache": None if self.cache is None else {"hits": self.cache.hits, "misses": self.cache.misses},
+                "recorder": None if self.record is None else {"path": self.record, "exports": self.exports,
+                                                              "last_export": self.last_export},
+                "execution": None if manager is None else {"state": manager.state, "pending": manager.pending,
+                                                           "replaced": manager.replaced, "timeouts": manager.timeouts,
+                                                           "late": manager.late, "unconfirmed": manager.unconfirmed,
+                                                           "stopped": manager.stopped,
+                                                           "last_program_ms": manager.last_program_ms}}
+
+    def serve_forever(self):
+        """
+        Wait until the service is stopped.
+        """
+        while not self.__stopped.wait(1):
+            pass
+
+    def shutdown(self):
+        """
+        Stop the service : close the control socket, wait for the current pick, then disconnect the robot.
+        """
+        self.__stopped.set()
+        self.__running.clear()
+        self.state = "stopping"
+        if self.__server is not None:
+            self.__server.close()
+        with self.__lock:
+            if self.manager is not None:
+                self.manager.close()
+            self.robot.close()
+            if self.recorder is not None:
+                self.recorder.flush()
+            self.state = "stopped"
+
+    def __pick(self, shape):
+        """
+        Pick once.
+
+        Parameters
+        ----------
+        shape : Shape
+            Shape to pick.
+
+        Returns
+        -------
+        result : dict
+            The pick's result.
+        """
+        tracker = self.tracker
+        frames = tracker.history if tracker is not None and tracker.tracking else 1
+        for _ in range(frames):
+            with tracing.span("grab"):
+                im = self.camera.get_image()
+            timestamp = getattr(self.camera, "frame_time", None) #the camera's time of the frame
+            if timestamp is None:
+                timestamp = time.time()
+            detection = None
+            try:
+                gray = to_gray(im.amplitude_image())
+                detection = detect(shape, gray) if self.cache is None else self.cache.detect(shape, gray)
+            finally:
+                self.__record_frame(im, detection, timestamp)
+            if detection.index is None:
+                return {"ok": False, "error": "No " + shape.name + " found.", "detected": len(detection.candidates)}
+            if tracker is None:
+                break
+            img_height, img_width = detection.image.shape
+            position = object_position(self.calibration, img_width, img_height, detection.center)
+            if tracker.update(position, timestamp) is not None:
+                break
+        features = detection.features
+        dist = self.__distance(im)
+        height, length, width = shape_size(features if features is not None else detection.contour, dist)
+        if detection.center is None or height is None:
+            return {"ok": False, "error": "The " + shape.name + "'s position or height can't be measured.",
+                    "detected": len(detection.candidates)}
+        if self.publisher is not None:
+            self.publisher.publish_detection(detection, (height, length, width), self.picks, timestamp)
+        img_height, img_width = detection.image.shape
+        get_object(self.calibration, img_width, img_height, detection.center, height, detection.angle,
+                   features, self.manager if self.manager is not None else self.robot, tracker, timestamp)
+        center = detection.center
+        return {"ok": True, "shape": shape.name, "center": [float(center[0]), float(center[1])],
+                "velocity": None if tracker is None else tracker.velocity,
+                "angle": float(detection.angle),
+                "dimensions": [None if value is None else float(value) for value in (height, length, width)]}
+
+    def __distance(self, im):
+        """
+        Get the distance image used for the height.
+
+        With depth_frames > 1 in the settings, it's the average of the last distance images : the frames are kept
+        between the picks, and the pixels that changed (an object placed or removed) are forgotten.
+        Frames are taken until all the pixels are averaged. On a conveyor, the single image is used.
+
+        Parameters
+        ----------
+        im : ImageBuffer
+            The frame of the detection.
+
+        Returns
+        -------
+        dist : numpy.ndarray
+            The distance image.
+        """
+        dist = im.distance_image()
+        nb_frames = get_settings().depth_frames
+        if nb_frames <= 1 or self.tracker is not None:
+            return dist
+        accumulator = self.accumulator
+        if accumulator is None or accumulator.nb_frames != nb_frames or accumulator.result.shape != dist.shape:
+            accumulator = self.accumulator = DepthAccumulator(*dist.shape, nb_frames)
+        result = accumulator.update(dist)
+        for _ in range(nb_frames-1):
+            if accumulator.ready:
+                break
+            with tracing.span("grab"):
+                result = accumulator.update(self.camera.get_image().distance_image())
+        return result
+
+    def __record_frame(self, im, detection, timestamp):
+        """
+        Record a frame and its result in the flight recorder.
+
+        Parameters
+        ----------
+        im : ImageBuffer
+            The frame.
+        detection : Detection
+            The detected shapes. None if the detection failed.
+        timestamp : float
+            Time of the frame, in seconds.
+        """
+        if self.record is None:
+            return
+        try:
+            amplitude, distance = im.amplitude_image(), im.distance_image()
+            if self.recorder is None:
+                from .recorder import FlightRecorder
+                self.recorder = FlightRecorder(self.record, self.record_slots, *amplitude.shape,
+                                               amplitude.dtype, distance.dtype)
+            result = b"" if detection is None else encode(detection, None, self.picks, timestamp)
+            self.recorder.record(amplitude, distance, result, timestamp)
+        except (OSError, ValueError) as e:
+            print(e)
+
+    def __export_recording(self):
+        """
+        Freeze the flight recorder and export its frames, after a failed pick.
+
+        The frames are exported once : the next failures are exported when the ring holds new frames only.
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return
+        seq = recorder.last_seq
+        if self.__exported is not None and seq - self.__exported < recorder.nb_slots:
+            return
+        folder = self.export if self.export is not None else os.path.dirname(os.path.abspath(self.record))
+        path = os.path.join(folder, time.strftime("failure-%Y%m%d-%H%M%S-") + str(self.picks) + ".npz")
+        recorder.freeze()
+        try:
+            os.makedirs(folder, exist_ok=True)
+            recorder.export(path)
+            self.__exported = seq
+            self.exports += 1
+            self.last_export = path
+        except OSError as e:
+            print(e)
+        finally:
+            recorder.unfreeze()
+
+    def __accept(self):
+        """
+        Accept the clients of the control socket.
+        """
+        while not self.__stopped.is_set():
+            try:
+                conn, _ = self.__server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.__serve, args=(conn,), daemon=True).start()
+
+    def __serve(self, conn):
+        """
+        Answer the commands of a client.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            Connection to the client.
+        """
+        with conn, conn.makefile("rwb") as stream:
+            for line in stream:
+                answer = self.__command(line.decode("utf-8", "replace").split())
+                stream.write(json.dumps(answer).encode("utf-8") + b"\n")
+                stream.flush()
+                if self.__stopped.is_set():
+                    return
+
+    def __command(self, words):
+        """
+        Run a command.
+
+        Parameters
+        ----------
+        words : list
+            The command and its argument.
+
+        Returns
+        -------
+        answer : dict
+            The answer.
+        """
+        if not words:
+            return {"ok": False, "error": "Empty command."}
+        command = words[0].upper()
+        if command == "PICK":
+            if len(words) > 1:
+                if words[1].upper() not in Shape.__members__:
+                    return {"ok": False, "error": "Unknown shape : " + words[1]}
+                return self.pick(Shape[words[1].upper()])
+            return self.pick()
+        if command == "RUN":
+            if self.manager is None:
+                return {"ok": False, "error": "RUN needs an execution manager : start the service with --queue."}
+            if len(words) > 1 and words[1].upper() not in Shape.__members__:
+                return {"ok": False, "error": "Unknown shape : " + words[1]}
+            shape = Shape[words[1].upper()] if len(words) > 1 else None
+            if not self.__running.is_set():
+                self.__running.set()
+                threading.Thread(target=self.run, args=(shape,), daemon=True).start()
+            return {"ok": True}
+        if command == "TRACE":
+            if len(words) < 2:
+                return {"ok": False, "error": "TRACE needs the path of the trace file."}
+            try:
+                trace = tracing.export(" ".join(words[1:]))
+            except OSError as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": True, "enabled": tracing.TRACER.enabled, "events": len(trace["traceEvents"])}
+        if command == "RELOAD":
+            if self.settings is None:
+                return {"ok": False, "error": "No settings file : start the service with --settings."}
+            with self.__lock:
+                reloaded = self.settings.refresh(force=True)
+            if self.settings.last_error is not None:
+                return {"ok": False, "error": self.settings.last_error}
+            return {"ok": True, "reloaded": reloaded}
+        if command == "STOP":
+            self.stop()
+            return {"ok": True}
+        if command == "HEALTH":
+            return dict(self.health(), ok=True)
+        if command == "SHUTDOWN":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": "Unknown command : " + words[0]}
+
+def load_calibration(path=CALIBRATION):
+    """
+    Load the positions of the robot on the image.
+
+    If the file doesn't exist, the positions are asked with the GUI, then saved in the file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    dic : dict
+        Dictionnary of positions. e.g 'Top Left': ['116', '-319']
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    from .gui import GUI_Positions
+    app = GUI_Positions()
+    app.window.mainloop()
+    dic = {title: [box.get() for box in boxes] for title, boxes in app.get_pos.items()}
+    app.window.destroy()
+    with open(path, "w") as f:
+        json.dump(dic, f, indent=4)
+    return dic
+
+def send_command(command, host=HOST, port=PORT, timeout=60.0):
+    """
+    Send a command to a running service.
+
+    Parameters
+    ----------
+    command : str
+        The command. e.g "PICK CIRCLE" or "HEALTH"
+    host : str
+        Address of the control socket.
+    port : int
+        Port of the control socket.
+    timeout : float
+        Time to wait for the answer, in seconds.
+
+    Returns
+    -------
+    answer : dict
+        The answer.
+    """
+    with socket.create_connection((host, port), timeout) as conn, conn.makefile("rwb") as stream:
+        stream.write(command.encode("utf-8") + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Pick-cell service, or a command to a running service.")
+    parser.add_argument("command", nargs="*", help="Command to send to a running service. e.g HEALTH. Empty to start the service.")
+    parser.add_argument("--host", default=HOST, help="Address of the control socket.")
+    parser.add_argument("--port", type=int, default=PORT, help="Port of the control socket.")
+    parser.add_argument("--calibration", default=CALIBRATION, help="JSON file of the robot positions.")
+    parser.add_argument("--shape", default=Shape.RECTANGLE.name, choices=list(Shape.__members__), help="Default shape to pick.")
+    parser.add_argument("--config", default=None, help="Camera preset, e.g low-latency.")
+    parser.add_argument("--conveyor-speed", default=None, help="Conveyor's velocity in the robot's frame, in mm/s. e.g 120,0")
+    parser.add_argument("--track", action="store_true", help="Estimate the conveyor's velocity by following the objects.")
+    parser.add_argument("--robot-latency", type=float, default=0.0, help="Time from the program sent to the grasp, in seconds.")
+    parser.add_argument("--settings", default=None, help="JSON file of the tuning parameters, reloaded when it changes.")
+    parser.add_argument("--trace", type=int, default=0, help="Number of trace spans kept, for TRACE. 0 to disable the tracing.")
+    parser.add_argument("--queue", action="store_true", help="Follow the programs and queue the next one, for RUN.")
+    parser.add_argument("--notify-host", default=None, help="Address of this computer, as seen by the robot.")
+    parser.add_argument("--notify-port", type=int, default=NOTIFY_PORT, help="Port the programs report their progress to.")
+    parser.add_argument("--state", action="store_true", help="Confirm the programs' reports with the robot's realtime state (port 30003).")
+    parser.add_argument("--publish", default=None, help="Publish the result of each pick on this address, host:port. e.g 127.0.0.1:30010")
+    parser.add_argument("--record", default=None, help="Ring file of the flight recorder, to record the frames of the picks.")
+    parser.add_argument("--record-slots", type=int, default=RECORD_SLOTS, help="Number of frames kept by the flight recorder.")
+    parser.add_argument("--cache", type=int, default=0, help="Number of detections cached, for the frames seen again. 0 to disable the cache.")
+    parser.add_argument("--export", default=None, help="Folder of the recordings of the failed picks. Default : the ring file's folder.")
+    args = parser.parse_args()
+    if args.command:
+        try:
+            print(json.dumps(send_command(" ".join(args.command), args.host, args.port)))
+        except OSError as e:
+            print(e)
+            sys.exit(1)
+        sys.exit(0)
+
+    tracker = None
+    if args.conveyor_speed is not None or args.track:
+        velocity = None if args.conveyor_speed is None else tuple(float(v) for v in args.conveyor_speed.split(","))
+        tracker = ConveyorTracker(velocity, args.robot_latency)
+    if args.trace > 0:
+        tracing.enable(args.trace)
+    try:
+        settings = None if args.settings is None else SettingsFile(args.settings)
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    publisher = None
+    if args.publish is not None:
+        from .pubsub import ResultPublisher
+        host, _, port = args.publish.rpartition(":")
+        try:
+            publisher = ResultPublisher(host or "127.0.0.1", int(port))
+        except (OSError, ValueError) as e:
+            print(e)
+            sys.exit(1)
+    manager = None
+    if args.queue:
+        from .robot_state import StateReader
+        manager = ExecutionManager(port=args.notify_port, notify_host=args.notify_host,
+                                   state=StateReader() if args.state else None)
+    if manager is not None and get_settings().drop_pose is None:
+        print("No drop_pose in the settings : each picture waits for the end of the previous program.")
+    from .Camera import Camera
+    daemon = PickDaemon(Camera(config=args.config), calibration=args.calibration, shape=Shape[args.shape],
+                        host=args.host, port=args.port, publisher=publisher, tracker=tracker, manager=manager, settings=settings,
+                        record=args.record, record_slots=args.record_slots, export=args.export,
+                        cache=ResultCache(args.cache) if args.cache > 0 else None)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+    signal.signal(signal.SIGINT, lambda *_: daemon.shutdown())
+    daemon.start()
+    print("Ready on", daemon.address)
+    daemon.serve_forever()
+    if publisher is not None:
+        publisher.close()
@@ -0,0 +1,162 @@
+import warnings
+import cv2
+import numpy as np
+
+SCENE_CHANGE = 0.02 #distance change of a pixel, in meters, from which its frames are forgotten
+
+class DepthAccumulator:
+    """
+    Average of the last distance images.
+
+    The distance image of the camera is noisy, so the height of an object changes from frame to frame.\n
+    The accumulator keeps the last N frames in preallocated buffers and gives their mean (or median).
+    The mean is updated with a running sum, in O(pixels) per frame.\n
+    Invalid pixels (distance 0) are ignored. When an object is placed or removed, the frames of the pixels whose
+    distance changed are forgotten : they get the new distance at once, and the other pixels keep their average.
+    A change is a group of pixels at least 3x3, so the noise of single pixels is still averaged.
+
+    The result can be given to shape_size instead of a single distance image.
+    """
+    def __init__(self, height, width, nb_frames=5, mode="mean", scene_change=SCENE_CHANGE):
+        """
+        Allocate the buffers.
+
+        Parameters
+        ----------
+        height : int
+            Image's height
+        width : int
+            Image's width
+        nb_frames : int
+            Number of frames to average.
+        mode : str
+            "mean" or "median".
+        scene_change : float
+            Distance change of a pixel, in meters, from which its frames are forgotten. None to never forget them.
+        """
+        if mode not in ("mean", "median"):
+            raise ValueError("The mode must be mean or median.")
+        self.nb_frames = nb_frames
+        self.mode = mode
+        self.scene_change = scene_change
+        self.size = 0
+        self.resets = 0 #frames where pixels changed
+        self.changed = 0 #pixels forgotten at the last frame
+        self.__index = 0
+        self.__settled = 0 #frames since the last change
+        self.__frames = np.zeros((nb_frames, height, width), np.float32)
+        self.__valid = np.zeros((nb_frames, height, width), np.uint8)
+        self.__sum = np.zeros((height, width), np.float64)
+        self.__count = np.zeros((height, width), np.int32)
+        self.__diff = np.zeros((height, width), np.float32)
+        self.__both = np.zeros((height, width), bool)
+        self.__mask = np.zeros((height, width), np.uint8)
+        self.__kernel = np.ones((3, 3), np.uint8)
+        self.__known = np.zeros((height, width), bool)
+        self.result = np.zeros((height, width), np.float32)
+
+    @property
+    def ready(self):
+        """
+        bool : True if N frames are averaged on every pixel.
+        """
+        return self.__settled >= self.nb_frames
+
+    def reset(self):
+        """
+        Forget all the frames.
+        """
+        self.size = 0
+        self.__index = 0
+        self.__settled = 0
+        self.__sum.fill(0)
+        self.__count.fill(0)
+        self.result.fill(0)
+
+    def update(self, dist):
+        """
+        Add a distance image.
+
+        Parameters
+        ----------
+        dist : numpy.ndarray
+            The distance image.
+
+        Returns
+        -------
+        result : numpy.ndarray
+            The average distance image. Its buffer is updated by the next frame.
+        """
+        self.changed = self.__changed(dist) if self.size else 0
+        if self.changed:
+            self.__forget(self.__both)
+            self.resets += 1
+            self.__settled = 0
+        self.__settled += 1
+        frame = self.__frames[self.__index]
+        valid = self.__valid[self.__index]
+        if self.size < self.nb_frames:
+            self.size += 1
+        elif self.mode == "mean": #forget the oldest frame
+            self.__sum -= frame
+            self.__count -= valid
+        np.greater(dist, 0, out=valid, casting="unsafe")
+        if self.mode == "mean":
+            np.copyto(frame, dist, casting="unsafe")
+            self.__sum += frame
+            self.__count += valid
+            self.result.fill(0)
+            np.greater(self.__count, 0, out=self.__known)
+            np.divide(self.__sum, self.__count, out=self.result, where=self.__known, casting="unsafe")
+        else:
+            np.copyto(frame, np.nan)
+            np.copyto(frame, dist, casting="unsafe", where=valid.view(bool))
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning) #pixels without any valid distance
+                np.nanmedian(self.__frames[:self.size], axis=0, out=self.result)
+            np.nan_to_num(self.result, copy=False)
+        self.__index = (self.__index+1) % self.nb_frames
+        return self.result
+
+    def __changed(self, dist):
+        """
+        Find the pixels whose distance changed. They are kept in the __both buffer.
+
+        Parameters
+        ----------
+        dist : numpy.ndarray
+            The new distance image.
+
+        Returns
+        -------
+        changed : int
+            Number of pixels, valid in both images, whose distance changed by more than scene_change,
+            like their neighbours.
+        """
+        if self.scene_change is None:
+            return 0
+        np.subtract(dist, self.result, out=self.__diff, casting="unsafe")
+        np.abs(self.__diff, out=self.__diff)
+        np.greater(self.__diff, self.scene_change, out=self.__both)
+        np.greater(dist, 0, out=self.__known)
+        np.logical_and(self.__both, self.__known, out=self.__both)
+        np.greater(self.result, 0, out=self.__known)
+        np.logical_and(self.__both, self.__known, out=self.__both)
+        np.copyto(self.__mask, self.__both, casting="unsafe")
+        cv2.morphologyEx(self.__mask, cv2.MORPH_OPEN, self.__kernel, dst=self.__mask) #drop the isolated pixels
+        np.greater(self.__mask, 0, out=self.__both)
+        return int(np.count_nonzero(self.__both))
+
+    def __forget(self, mask):
+        """
+        Forget the frames of some pixels.
+
+        Parameters
+        ----------
+        mask : numpy.ndarray
+            The pixels to forget.
+        """
+        self.__frames[:, mask] = 0 if self.mode == "mean" else np.nan
+        self.__valid[:, mask] = 0
+        self.__sum[mask] = 0
+        self.__count[mask] = 0
@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from .Shape import Shape
+
+class Detection:
+    """
+    Result of the detection of a shape on an image.
+
+    It keeps the geometry of the shapes. Nothing is drawn on the analysed image :
+    the annotated image is only rendered, on a copy, when overlay is called.
+    """
+    def __init__(self, shape, image, candidates, detected_list):
+        """
+        Create the result.
+
+        The first shape of the wanted type is kept.
+
+        Parameters
+        ----------
+        shape : Shape
+            The shape we want to detect
+        image : numpy.ndarray
+            The analysed image. If it's a buffer reused by the next frame, give the image to overlay instead.
+        candidates : list of ContourFeatures
+            Geometry of the shapes.
+        detected_list : numpy.ndarray
+            The detected shape (Shape value) of each candidate.
+        """
+        self.shape = shape
+        self.image = image
+        self.candidates = candidates
+        self.detected_list = detected_list
+        self.index = None
+        if shape != Shape.ALL:
+            found = np.flatnonzero(detected_list == shape.value)
+            if found.size:
+                self.index = int(found[0])
+
+    @property
+    def nb_checked(self):
+        """
+        int : Number of shapes checked before finding the wanted one.
+        """
+        return len(self.candidates) if self.index is None else self.index+1
+
+    @property
+    def detected_shapes(self):
+        """
+        list : Names of the checked shapes.
+        """
+        return [Shape(detected).name for detected in self.detected_list[:self.nb_checked].tolist()]
+
+    @property
+    def features(self):
+        """
+        ContourFeatures : Geometry of the detected shape. None if it's not found, or if the shape is ALL, PARTIAL or UNKNOW.
+        """
+        if self.index is None or self.shape in (Shape.PARTIAL, Shape.UNKNOW):
+            return None
+        return self.candidates[self.index]
+
+    @property
+    def contour(self):
+        """
+        numpy.ndarray : Contours of the detected shape. Or an empty array.
+        """
+        features = self.features
+        return np.array([]) if features is None else features.approx
+
+    @property
+    def center(self):
+        """
+        tuple of float : Center of the detected shape. Or None.
+        """
+        return None if self.index is None else self.candidates[self.index].center
+
+    @property
+    def angle(self):
+        """
+        float : Angle of rotation of the detected shape. Or None.
+        """
+        return None if self.index is None else self.candidates[self.index].angle
+
+    def overlay(self, img=None):
+        """
+        Draw the checked shapes and their name.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image to draw on. It is copied. None to use the analysed image.
+
+        Returns
+        -------
+        overlay : numpy.ndarray
+            The annotated copy of the image.
+        """
+        overlay = (self.image if img is None else img).copy()
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        for features, detected in zip(self.candidates[:self.nb_checked], self.detected_list.tolist()):
+            cv2.drawContours(overlay,[features.approx],0,(255),3)
+            if self.shape == Shape.ALL or detected == self.shape.value:
+                x = features.contour[0][0][0]   #x value of a point of the shape
+                y = features.contour[0][0][1]   #y value of a point of the shape
+                cv2.putText(overlay, Shape(detected).name,(x,y),font,0.5,(255))
+        return overlay
+
+    def as_tuple(self, features=False):
+        """
+        Get the result like shape_recognition.
+
+        The overlay is rendered.
+
+        Parameters
+        ----------
+        features : bool
+            If True, the geometry of the detected shape is returned too.
+
+        Returns
+        -------
+        Same as shape_recognition.
+        """
+        result = (self.contour, self.overlay(), self.detected_shapes, self.center, self.angle)
+        if features:
+            result += (self.features,)
+        return result
@@ -0,0 +1,381 @@
+import time
+import socket
+import threading
+import numpy as np
+from .ur3 import Robot
+from .settings import get_settings
+
+PORT = 30030
+PROGRAM_TIMEOUT = 30.0 #s, a program without its done report is given up
+CONFIRM_TIMEOUT = 1.0 #s, longest wait for the realtime state to confirm a report
+JOINT_TOLERANCE = 0.01 #rad, largest difference between the actual joints and the drop-off pose
+
+class ExecutionManager:
+    """
+    Run the programs on the robot one after the other, and follow their progress.
+
+    The programs built with a notify address report their steps on a socket opened by the manager :
+    started, cleared (the arm is out of the camera's field of view) and done, with the program's ID.
+    The reports of a program given up are ignored.\n
+    A program sent while the previous one runs would abort it. So the next program waits in the manager,
+    and is sent when the previous one reports done.\n
+    The next picture can be taken as soon as the arm is cleared : see wait_ready.
+
+    With a StateReader, the reports are confirmed by the realtime state of the robot : cleared when the actual joints
+    are at the drop-off pose, done when the controller's program has stopped. A program that stops without its
+    done report (e.g a protective stop) ends at once, without waiting for the timeout.
+
+    It's used as the robot by ur3.get_object.\n
+    Without drop-off pose in the settings, the arm is cleared when the program is done : there's no overlap.
+    """
+    def __init__(self, robot=None, host="", port=PORT, notify_host=None, program_timeout=PROGRAM_TIMEOUT,
+                 on_cleared=None, state=None):
+        """
+        Create the manager. The report socket is opened at start.
+
+        Parameters
+        ----------
+        robot : Robot
+            Connection to the robot. None for the default robot.
+        host : str
+            Address the report socket listens on. Empty for all the interfaces.
+        port : int
+            Port of the report socket. 0 to choose a free port.
+        notify_host : str
+            Address of the computer, as seen by the robot. None for the local address of the robot's connection.
+        program_timeout : float
+            Time to wait for the done report of a program, in seconds.
+        on_cleared : function
+            Called without argument when the arm is cleared. e.g to trigger the camera.
+        state : StateReader
+            Realtime state of the robot, to confirm the reports. None to trust the reports.
+            It's started and closed with the manager.
+        """
+        self.robot = robot if robot is not None else Robot()
+        self.address = (host, port)
+        self.notify_host = notify_host
+        self.program_timeout = program_timeout
+        self.on_cleared = on_cleared
+        self.reader = state
+        self.state = "idle"
+        self.replaced = 0
+        self.timeouts = 0
+        self.late = 0 #reports of programs given up
+        self.unconfirmed = 0 #reports not confirmed by the realtime state in time
+        self.stopped = 0 #programs stopped without done report, seen in the realtime state
+        self.last_program_ms = None
+        self.__ids = 0
+        self.__current = None #ID of the program sent
+        self.__pending = None
+        self.__sent_at = None
+        self.__ends = 0 #program ends of the realtime state before the current program
+        self.__condition = threading.Condition()
+        self.__server = None
+
+    def next_notify(self):
+        """
+        Get the report address of the next program, with a new program ID.
+
+        Call it once per program : build the program with it, then send it.
+
+        Returns
+        -------
+        notify : tuple
+            Address (host, port) the programs report to, and the program's ID (host, port, id). None before start.
+        """
+        if self.__server is None:
+            return None
+        host = self.notify_host
+        if host is None:
+            self.robot.connect()
+            host = self.robot.sock.getsockname()[0]
+        with self.__condition:
+            self.__ids += 1
+            return host, self.address[1], self.__ids
+
+    @property
+    def pending(self):
+        """
+        bool : True if a program waits for the end of the current one.
+        """
+        return self.__pending is not None
+
+    @property
+    def connected(self):
+        """
+        bool : True if the connection to the robot is open.
+        """
+        return self.robot.connected
+
+    @property
+    def sent(self):
+        """
+        int : Number of programs sent to the robot.
+        """
+        return self.robot.sent
+
+    @property
+    def reconnects(self):
+        """
+        int : Number of reconnections to the robot.
+        """
+        return self.robot.reconnects
+
+    def start(self):
+        """
+        Open the report socket, if it's not open.
+        """
+        if self.__server is not None:
+            return
+        if self.reader is not None:
+            self.reader.start()
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind(self.address)
+        self.__server.listen()
+        self.address = self.__server.getsockname()
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def connect(self):
+        """
+        Open the connection to the robot, if it's not open.
+        """
+        self.robot.connect()
+
+    def send(self, program, program_id=None):
+        """
+        Run a program : now if the robot is idle, else when the current program is done.
+
+        Only one program waits : a newer program replaces it.
+
+        Parameters
+        ----------
+        program : str
+            The program, built with the notify address.
+        program_id : int
+            ID of the program, given by next_notify. None for the last ID given.
+        """
+        with self.__condition:
+            if program_id is None:
+                program_id = self.__ids
+            self.__check_timeout()
+            if self.state == "idle":
+                self.__run(program, program_id)
+            else:
+                if self.__pending is not None:
+                    self.replaced += 1
+                self.__pending = (program, program_id)
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait until the next picture can be taken : the robot is idle or the arm is cleared, and no program waits.
+
+        Parameters
+        ----------
+        timeout : float
+            Time to wait, in seconds. None to wait without limit.
+
+        Returns
+        -------
+        ready : bool
+            False if the timeout expired.
+        """
+        return self.__wait(("idle", "cleared"), timeout)
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until the robot is idle and no program waits.
+
+        Parameters
+        ----------
+        timeout : float
+            Time to wait, in seconds. None to wait without limit.
+
+        Returns
+        -------
+        idle : bool
+            False if the timeout expired.
+        """
+        return self.__wait(("idle",), timeout)
+
+    def close(self):
+        """
+        Close the report socket and the connection to the robot. A waiting program is dropped.
+        """
+        with self.__condition:
+            self.__pending = None
+            self.state = "idle"
+            self.__condition.notify_all()
+        if self.__server is not None:
+            self.__server.close()
+            self.__server = None
+        if self.reader is not None:
+            self.reader.close()
+        self.robot.close()
+
+    def __wait(self, states, timeout):
+        """
+        Wait until the robot is in one of the states and no program waits.
+
+        Parameters
+        ----------
+        states : tuple
+            The accepted states.
+        timeout : float
+            Time to wait, in seconds. None to wait without limit.
+
+        Returns
+        -------
+        reached : bool
+            False if the timeout expired.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                self.__check_timeout()
+                if self.state in states and self.__pending is None:
+                    return True
+                remaining = 0.1 if end is None else min(end - time.monotonic(), 0.1)
+                if remaining <= 0:
+                    return False
+                self.__condition.wait(remaining) #wakes up to check the timeout
+
+    def __run(self, program, program_id):
+        """
+        Send a program. The condition must be held.
+
+        Parameters
+        ----------
+        program : str
+            The program.
+        program_id : int
+            ID of the program.
+        """
+        if self.reader is not None:
+            self.__ends = self.reader.program_ends
+        self.robot.send(program)
+        self.__current = program_id
+        self.__sent_at = time.monotonic()
+        self.state = "sent" if self.__server is not None else "idle" #without the report socket, nothing to follow
+
+    def __step(self, report):
+        """
+        Follow a step reported by a program.
+
+        Parameters
+        ----------
+        report : str
+            The step (started, cleared or done) and the program's ID. e.g done 12
+        """
+        words = report.split()
+        if not words:
+            return
+        step = words[0]
+        try:
+            program_id = int(words[1]) if len(words) > 1 else None
+        except ValueError:
+            return
+        if step in ("cleared", "done") and self.reader is not None:
+            with self.__condition:
+                following = program_id in (None, self.__current) and self.state != "idle"
+                if following and step == "done":
+                    self.state = "done" #the program stops, it's not a stop without report
+            if following:
+                self.__confirm(step)
+        cleared = False
+        with self.__condition:
+            if program_id is not None and program_id != self.__current:
+                self.late += 1
+                return
+            if self.state == "idle":
+                return
+            if step == "started":
+                self.state = "running"
+            elif step == "cleared":
+                self.state = "cleared"
+                cleared = True
+            elif step == "done":
+                self.last_program_ms = (time.monotonic()-self.__sent_at)*1000
+                self.__next()
+            self.__condition.notify_all()
+        if cleared and self.on_cleared is not None:
+            self.on_cleared()
+
+    def __confirm(self, step):
+        """
+        Wait until the realtime state matches a report : the arm at the drop-off pose, or the program stopped.
+
+        If it doesn't match in CONFIRM_TIMEOUT, the report is followed anyway and counted in unconfirmed.
+
+        Parameters
+        ----------
+        step : str
+            cleared or done.
+        """
+        reader = self.reader
+        if step == "done":
+            state = reader.wait_program_end(CONFIRM_TIMEOUT, self.__ends)
+        else:
+            pose = get_settings().drop_pose
+            if pose is None:
+                return
+            pose = np.array(pose)
+            state = reader.wait(lambda s: np.abs(s.joints-pose).max() < JOINT_TOLERANCE, CONFIRM_TIMEOUT)
+        if state is None:
+            self.unconfirmed += 1
+
+    def __next(self):
+        """
+        Send the waiting program, or go idle. The condition must be held.
+        """
+        pending, self.__pending = self.__pending, None
+        self.state = "idle"
+        self.__current = None
+        if pending is not None:
+            try:
+                self.__run(*pending)
+            except OSError as e:
+                print(e)
+
+    def __check_timeout(self):
+        """
+        Give up the current program if its done report is late. The condition must be held.
+        """
+        if self.state == "idle":
+            return
+        if self.reader is not None and self.state not in ("sent", "done") and self.reader.program_ends > self.__ends:
+            self.stopped += 1 #the program started and stopped, without done report
+            self.__next()
+            self.__condition.notify_all()
+        elif time.monotonic()-self.__sent_at > self.program_timeout:
+            self.timeouts += 1
+            self.__next()
+            self.__condition.notify_all()
+
+    def __accept(self):
+        """
+        Accept the connections of the programs.
+        """
+        server = self.__server
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.__read, args=(conn,), daemon=True).start()
+
+    def __read(self, conn):
+        """
+        Read the steps reported by a program.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            Connection of the program.
+        """
+        with conn, conn.makefile("rb") as stream:
+            try:
+                for line in stream:
+                    self.__step(line.decode("utf-8", "replace").strip().lower())
+            except OSError:
+                pass
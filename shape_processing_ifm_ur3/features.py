@@ -0,0 +1,108 @@
+import cv2
+from .settings import get_settings
+
+class ContourFeatures:
+    """
+    Geometry of one contour.
+
+    Each value is computed at the first access, then kept.\n
+    The same object is used to classify the shape, to get its position and to get its size,
+    so all of them use the same geometry.
+    """
+    __slots__ = ("contour", "_area", "_perimeter", "_approx", "_min_area_rect",
+                 "_enclosing_circle", "_ellipse", "_bounding_rect")
+
+    def __init__(self, contour):
+        """
+        Create the features of a contour.
+
+        Parameters
+        ----------
+        contour : numpy.ndarray
+            Contours of the shape.
+        """
+        self.contour = contour
+        self._area = None
+        self._perimeter = None
+        self._approx = None
+        self._min_area_rect = None
+        self._enclosing_circle = None
+        self._ellipse = None
+        self._bounding_rect = None
+
+    @property
+    def area(self):
+        """
+        float : Area of the contour.
+        """
+        if self._area is None:
+            self._area = cv2.contourArea(self.contour)
+        return self._area
+
+    @property
+    def perimeter(self):
+        """
+        float : Perimeter of the closed contour.
+        """
+        if self._perimeter is None:
+            self._perimeter = cv2.arcLength(self.contour, True)
+        return self._perimeter
+
+    @property
+    def approx(self):
+        """
+        numpy.ndarray : Approximated polygon. With approxPolyDP we get only one position per side.
+        """
+        if self._approx is None:
+            self._approx = cv2.approxPolyDP(self.contour, get_settings().approx_epsilon*self.perimeter, True)
+        return self._approx
+
+    @property
+    def min_area_rect(self):
+        """
+        tuple : Rotated rectangle of minimum area. ((x, y), (width, height), angle)
+        """
+        if self._min_area_rect is None:
+            self._min_area_rect = cv2.minAreaRect(self.contour)
+        return self._min_area_rect
+
+    @property
+    def center(self):
+        """
+        tuple of float : Center of the rotated rectangle.
+        """
+        return self.min_area_rect[0]
+
+    @property
+    def angle(self):
+        """
+        float : Angle of rotation of the rotated rectangle.
+        """
+        return self.min_area_rect[2]
+
+    @property
+    def enclosing_circle(self):
+        """
+        tuple : Minimum enclosing circle. ((x, y), radius)
+        """
+        if self._enclosing_circle is None:
+            self._enclosing_circle = cv2.minEnclosingCircle(self.contour)
+        return self._enclosing_circle
+
+    @property
+    def ellipse(self):
+        """
+        tuple : Fitted ellipse. ((x, y), (a, b), angle). The contour needs at least 5 points.
+        """
+        if self._ellipse is None:
+            self._ellipse = cv2.fitEllipse(self.contour)
+        return self._ellipse
+
+    @property
+    def bounding_rect(self):
+        """
+        tuple of int : Upright bounding rectangle. (x, y, width, height)
+        """
+        if self._bounding_rect is None:
+            self._bounding_rect = cv2.boundingRect(self.contour)
+        return self._bounding_rect
@@ -0,0 +1,119 @@
+from tkinter import *
+
+class GUI_Positions:
+    """
+        GUI Position class is a GUI to declare the position of the robot on the image.
+        It will save the robot position at the top left, top right, 
+        bottom left and bottom right of the camera's view.
+        """
+    def __init__(self):
+        """
+        Initialise the GUI.
+        """
+        self.window = Tk()
+        self.frame = Frame(self.window)
+        self.pos_value={}
+        self.__create_widgets()
+        self.frame.pack(expand=YES)
+
+    @property
+    def get_pos(self):
+        """
+        Get the robot position.
+
+        Returns
+        -------
+        pos_value : dict
+            A dictionnary that contains the positions. e.g 'Top Left': ['116', '-319']
+        """
+        return self.pos_value
+    
+    def __create_widgets(self):
+        """
+        Create widgets.
+        """
+        self.__create_pos_box("Top Left").pack()
+        self.__create_pos_box("Top Right").pack()
+        self.__create_pos_box("Bottom Left").pack()
+        self.__create_pos_box("Bottom Right").pack()
+        val = self.__create_pos(self.frame,"z : ",-50,500)
+        self.pos_value["Z"] = [val]
+        Button(self.frame,text="Validate",command=self.window.quit,width=15).pack()
+
+    def __create_pos_box(self,title):
+        """
+        Create widget for each positions.
+
+
+        Parameters
+        ----------
+        title : str
+            Title's widget.
+
+        Returns
+        -------
+        frame_pos : tkinter.Frame
+            The frame that contains the label and 2 box for x and y position.
+        """
+        frame_pos = Frame(self.frame)
+        label_title = Label(frame_pos,text=title)
+        label_title.pack()
+        x,y = self.__create_xy(frame_pos)
+        self.pos_value[title]= [x,y]
+        return frame_pos
+
+    def __create_xy(self,frame):
+        """
+        Create 2 box. One for x another for y.
+        Spinbox can have a value from -540 to 540.
+        To get it I moved the robot as far as possible and I took the values.
+
+        Parameters
+        ----------
+        frame : tkinter.Frame
+            Frame to put the widget.
+
+        Returns
+        -------
+        x : tkinter.Spinbox
+            Spinbox with the selected x value
+        y : tkinter.Spinbox
+            Spinbox with the selected y value
+        """
+        frame_xy = Frame(frame)
+        x = self.__create_pos(frame_xy,"x : ",-540,540)
+        y = self.__create_pos(frame_xy,"y : ",-540,540)
+        frame_xy.pack()
+        return x, y
+
+    def __create_pos(self,frame,text,minV,maxV):
+        """
+        Create a spinbox with a minimal and maximale value.
+
+        Parameters
+        ----------
+        frame : tkinter.Frame
+            Frame to put the widget.
+        text : str
+            Title of the box
+        minV : int
+            Minimal value for a position.
+        maxV : int
+            Maximal value for a position.
+
+        Returns
+        -------
+        num : tkinter.Spinbox
+            Spinbox. The value is in mm.
+        """
+        frame_entry_pos = Frame(frame)
+        lab = Label(frame_entry_pos,text=text)
+        num = Spinbox(frame_entry_pos,from_=minV, to=maxV)
+        num.delete(0,END)
+        num.insert(0,0)
+        lab.grid(row = 0, column = 0)
+        num.grid(row = 0, column = 1)
+        Label(frame_entry_pos,text=" mm").grid(row = 0, column = 2)
+        frame_entry_pos.pack()
+
+        return num
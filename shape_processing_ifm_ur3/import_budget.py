@@ -0,0 +1,86 @@
+import sys
+import json
+import argparse
+import subprocess
+
+BUDGET_MS = 500
+
+OFFLINE_MODULES = ["shape_recognition", "shape_size", "cache", "detection", "serialization", "pubsub",
+                   "depth_average", "recorder", "ur3", "main"]
+
+HARDWARE_MODULES = ["ifm3dpy", "tkinter"]
+
+CHECK = """
+import sys, json, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__("shape_processing_ifm_ur3." + name)
+elapsed = (time.perf_counter() - start)*1000
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {hardware!r} if m in sys.modules]}}))
+"""
+
+def check_imports(modules=OFFLINE_MODULES, budget_ms=BUDGET_MS):
+    """
+    Import the offline modules in a new process, like a batch job or a health check.
+
+    Parameters
+    ----------
+    modules : list
+        Names of the submodules to import.
+    budget_ms : float
+        Maximal import time, in milliseconds.
+
+    Returns
+    -------
+    elapsed : float
+        Import time, in milliseconds.
+    errors : list
+        Why the check failed. Empty if it passed.
+    """
+    code = CHECK.format(modules=list(modules), hardware=HARDWARE_MODULES)
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if process.returncode != 0:
+        return None, [process.stderr.strip().splitlines()[-1]]
+    result = json.loads(process.stdout)
+    errors = []
+    for name in result["loaded"]:
+        errors.append(name + " is imported without the camera or the GUI.")
+    if result["elapsed"] > budget_ms:
+        errors.append("Import time is " + str(round(result["elapsed"])) + " ms, the budget is " + str(budget_ms) + " ms.")
+        errors += __slowest(process.stderr)
+    return result["elapsed"], errors
+
+def __slowest(importtime, nb=10):
+    """
+    Get the slowest imports.
+
+    Parameters
+    ----------
+    importtime : str
+        Output of python -X importtime.
+    nb : int
+        Number of imports.
+
+    Returns
+    -------
+    lines : list
+        The slowest imports, with their cumulative time in microseconds.
+    """
+    imports = []
+    for line in importtime.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].rstrip()))
+    imports.sort(reverse=True)
+    return ["  " + str(cumulative) + " us" + name for cumulative, name in imports[:nb]]
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Check the import time of the offline modules, and that they don't load the hardware libraries.")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="Maximal import time, in milliseconds.")
+    args = parser.parse_args()
+    elapsed, errors = check_imports(budget_ms=args.budget)
+    if elapsed is not None:
+        print("Import time : ", round(elapsed), "ms")
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
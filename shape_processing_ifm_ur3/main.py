@@ -1,30 +1,43 @@
-import ifm3dpy
 import cv2
-from shape_recognition import shape_recognition
-from shape_size import shape_size
-from Camera import Camera
-from Shape import Shape
-from ur3 import get_object, GUI_Positions
+from .shape_recognition import detect
+from .shape_size import shape_size
+from .Shape import Shape
+from .ur3 import get_object
 
-def main():
-    cam = Camera.Camera()
+def main(publisher=None):
+    """
+    Take a picture, detect the rectangle and grab it.
+
+    Parameters
+    ----------
+    publisher : ResultPublisher
+        If given, the result is published to its subscribers.
+    """
+    from .Camera import Camera #ifm3dpy and tkinter are only loaded here
+    from .gui import GUI_Positions
+    cam = Camera()
     try:
         im = cam.get_image()
     except RuntimeError as e:
         print(e)
         return -1
+    timestamp = cam.frame_time
     cv2.imwrite("detectedShape.png",im.amplitude_image())
-    cont, img, detected, center, angle = shape_recognition(Shape.Shape.RECTANGLE,"detectedShape.png")
-    height, length, width = shape_size(cont, im.distance_image())
-    cv2.imwrite("detectedShape.png",img)
+    detection = detect(Shape.RECTANGLE,"detectedShape.png")
+    features = detection.features
+    height, length, width = shape_size(features if features is not None else detection.contour, im.distance_image())
+    cv2.imwrite("detectedShape.png",detection.overlay())
+    if publisher is not None:
+        publisher.publish_detection(detection, (height, length, width), timestamp=timestamp)
 
-    print("Detected : ", detected)
+    print("Detected : ", detection.detected_shapes)
     print("Height : ",height," Length : ",length, " Width : ",width)
 
     app = GUI_Positions()
-    dic = app.get_pos()
-    img_height, img_width = img.shape
-    get_object(dic,img_width,img_height,center,height,angle)
+    app.window.mainloop()
+    dic = {title: [box.get() for box in boxes] for title, boxes in app.get_pos.items()}
+    img_height, img_width = detection.image.shape
+    get_object(dic,img_width,img_height,detection.center,height,detection.angle,features)
 
 if __name__=='__main__':
     main()
@@ -0,0 +1,436 @@
+import os
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .tracing import span, current_frame
+from .settings import get_settings
+
+class Preprocessor:
+    """
+    Preprocessing engine with reusable output buffers.
+
+    All the buffers and the kernel are allocated once, for the sensor resolution.\n
+    Every OpenCV call writes into these buffers, so no array is allocated per frame.\n
+    The returned images are the engine's buffers : they are overwritten by the next frame.\n
+    The blur, Canny and closing parameters are read from the current settings at each frame.
+    """
+    def __init__(self, height, width):
+        """
+        Allocate the buffers.
+
+        Parameters
+        ----------
+        height : int
+            Image's height
+        width : int
+            Image's width
+        """
+        self.height = height
+        self.width = width
+        self.kernel = np.ones((3,3),np.uint8)
+        self.blur = np.empty((height, width), np.uint8)
+        self.edges = np.empty((height, width), np.uint8)
+        self.closed = np.empty((height, width), np.uint8)
+        self.src = np.empty((height, width), np.uint8)
+        self.mask = np.empty((height+2, width+2), np.uint8)
+
+    def process(self, img, roi=None):
+        """
+        Process the image.
+
+        Blur and detect the edges of the image.\n
+        The Canny output stays available in `edges`.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The grayscale image.
+        roi : tuple of int
+            Only process this region (x, y, width, height) of the image. None for the whole image.
+
+        Returns
+        -------
+        closed : numpy.ndarray
+            The image whose shapes we want to detect. Only the region if `roi` is given.
+        """
+        settings = get_settings()
+        blur = self.__view(self.blur, roi)
+        edges = self.__view(self.edges, roi)
+        closed = self.__view(self.closed, roi)
+        cv2.GaussianBlur(self.__view(img, roi), settings.blur_size, settings.blur_sigma, dst=blur)
+        cv2.Canny(blur, settings.canny_low, settings.canny_high, edges=edges)
+        cv2.morphologyEx(edges, cv2.MORPH_CLOSE, self.kernel, dst=closed, iterations=settings.close_iterations)
+        return closed
+
+    def fill_holes(self, img, roi=None):
+        """
+        Fill the hole of the shapes.
+
+        The image is modified in place.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image whose shapes we want to detect
+        roi : tuple of int
+            Only fill this region (x, y, width, height) of the image. None for the whole image.
+
+        Returns
+        -------
+        img : numpy.ndarray
+            The image without holes. Only the region if `roi` is given.
+        """
+        img = self.__view(img, roi)
+        height, width = img.shape
+        src = self.__view(self.src, roi)
+        mask = self.mask[:height+2, :width+2]
+        np.copyto(src, img)
+        mask.fill(0)
+        cv2.floodFill(img, mask, (0,0), 255)
+        cv2.floodFill(img, mask, (int(width/2),10), 255) #The outside of the shapes will be white
+        cv2.bitwise_not(img, dst=img)
+        cv2.bitwise_or(src, img, dst=img) #merge the 2 images
+        return img
+
+    def __view(self, img, roi):
+        """
+        Get a region of an image, without copy.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The image.
+        roi : tuple of int
+            The region (x, y, width, height). None for the whole image.
+
+        Returns
+        -------
+        view : numpy.ndarray
+            The region of the image.
+        """
+        if roi is None:
+            return img
+        x, y, w, h = roi
+        return img[y:y+h, x:x+w]
+
+class TiledPreprocessor(Preprocessor):
+    """
+    Preprocessing engine that splits the image in tiles, processed by a pool of threads.
+
+    OpenCV releases the GIL, so the tiles are processed at the same time.\n
+    Each tile is processed with a halo : the pixels around it that its kernels read.
+    Only the tile is kept from the result, so the seams are the same as with the whole image.\n
+    The hysteresis of Canny is not local : a weak edge is kept if it's connected to a strong edge, at any distance.
+    So each tile gives its weak edges (Canny with the low threshold) and its strong edges (Canny with the high
+    threshold), and keeps its weak edges connected to a strong edge in the tile.
+    Then the weak edges that touch a seam are merged with the edges of the next tiles.\n
+    The result is the same as Preprocessor.\n
+    The halos depend on the settings : the tile buffers are allocated again when they change.
+    """
+    def __init__(self, height, width, tiles=(2,2), workers=None):
+        """
+        Allocate the buffers and start the threads.
+
+        Parameters
+        ----------
+        height : int
+            Image's height
+        width : int
+            Image's width
+        tiles : tuple of int
+            Number of rows and columns of tiles.
+        workers : int
+            Number of threads. None for the number of CPU.
+        """
+        super().__init__(height, width)
+        rows, cols = tiles
+        row_starts = sorted(set(height*i//rows for i in range(rows)))
+        col_starts = sorted(set(width*j//cols for j in range(cols)))
+        self.row_starts = np.array(row_starts)
+        self.col_starts = np.array(col_starts)
+        self.tiles = [(y0, y1, x0, x1) for y0, y1 in zip(row_starts, row_starts[1:] + [height])
+                      for x0, x1 in zip(col_starts, col_starts[1:] + [width])]
+        self.labels = np.empty((height, width), np.int32) #labels of the weak edges, in each tile
+        self.halos = None
+        self.__allocate(get_settings())
+        self.pool = ThreadPoolExecutor(workers or os.cpu_count())
+
+    def process(self, img, roi=None):
+        """
+        Process the image, tile by tile.
+
+        Blur and detect the edges of the image.\n
+        The Canny output stays available in `edges`.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The grayscale image.
+        roi : tuple of int
+            Only process this region (x, y, width, height) of the image, without tiles. None for the whole image.
+
+        Returns
+        -------
+        closed : numpy.ndarray
+            The image whose shapes we want to detect. Only the region if `roi` is given.
+        """
+        if roi is not None:
+            return super().process(img, roi)
+        settings = get_settings() #the same for all the tiles
+        self.__allocate(settings)
+        frame = current_frame() #the spans of the pool's threads belong to this frame
+        def edges(i):
+            with span("edges", frame, tile=i):
+                return self.__edges(img, i, settings)
+        def close(i):
+            with span("close", frame, tile=i):
+                self.__close(i, settings)
+        keeps = list(self.pool.map(edges, range(len(self.tiles))))
+        with span("seams"):
+            for i in self.__merge_seams(keeps):
+                self.__keep(i, keeps[i])
+        list(self.pool.map(close, range(len(self.tiles))))
+        return self.closed
+
+    def close(self):
+        """
+        Stop the threads.
+        """
+        self.pool.shutdown()
+
+    def __allocate(self, settings):
+        """
+        Allocate the buffers of the tiles, if the halos of the settings changed.
+
+        Parameters
+        ----------
+        settings : Settings
+            The settings of the frame.
+        """
+        halos = (max(settings.blur_size)//2 + 2, #blur, then the Sobel filter and the non-maximum suppression of Canny
+                 2*settings.close_iterations)    #dilate, then erode, with a 3x3 kernel
+        if halos == self.halos:
+            return
+        self.halos = halos
+        self.__buffers = []
+        for tile in self.tiles:
+            edges_shape = self.__padded_shape(tile, halos[0])
+            y0, y1, x0, x1 = tile
+            self.__buffers.append((np.empty(edges_shape, np.uint8), np.empty(edges_shape, np.uint8),
+                                   np.empty(edges_shape, np.uint8), np.empty((y1-y0, x1-x0), np.int32),
+                                   np.empty(self.__padded_shape(tile, halos[1]), np.uint8)))
+
+    def __halo(self, tile, halo):
+        """
+        Get a tile with its halo.
+
+        Parameters
+        ----------
+        tile : tuple of int
+            The tile (y0, y1, x0, x1).
+        halo : int
+            Size of the halo, in pixels.
+
+        Returns
+        -------
+        padded : tuple of slice
+            The tile with its halo, inside the image.
+        inner : tuple of slice
+            The tile, in the padded tile.
+        """
+        y0, y1, x0, x1 = tile
+        py0, px0 = max(y0-halo, 0), max(x0-halo, 0)
+        py1, px1 = min(y1+halo, self.height), min(x1+halo, self.width)
+        return (slice(py0, py1), slice(px0, px1)), (slice(y0-py0, y1-py0), slice(x0-px0, x1-px0))
+
+    def __padded_shape(self, tile, halo):
+        """
+        Get the shape of a tile with its halo.
+
+        Parameters
+        ----------
+        tile : tuple of int
+            The tile (y0, y1, x0, x1).
+        halo : int
+            Size of the halo, in pixels.
+
+        Returns
+        -------
+        shape : tuple of int
+            Height and width.
+        """
+        rows, cols = self.__halo(tile, halo)[0]
+        return rows.stop-rows.start, cols.stop-cols.start
+
+    def __edges(self, img, i, settings):
+        """
+        Blur a tile, get its weak and strong edges, and keep the weak edges connected to a strong edge in the tile.
+
+        Parameters
+        ----------
+        img : numpy.ndarray
+            The grayscale image.
+        i : int
+            Index of the tile.
+        settings : Settings
+            The settings of the frame.
+
+        Returns
+        -------
+        keep : numpy.ndarray
+            255 for each label of the tile's weak edges connected to a strong edge, else 0.
+        """
+        tile = self.tiles[i]
+        padded, inner = self.__halo(tile, self.halos[0])
+        y0, y1, x0, x1 = tile
+        blur, weak, strong, labels = self.__buffers[i][:4]
+        cv2.GaussianBlur(img[padded], settings.blur_size, settings.blur_sigma, dst=blur)
+        cv2.Canny(blur, settings.canny_low, settings.canny_low, edges=weak)
+        cv2.Canny(blur, settings.canny_high, settings.canny_high, edges=strong)
+        self.blur[y0:y1, x0:x1] = blur[inner]
+        count = cv2.connectedComponents(weak[inner], labels, 8, cv2.CV_32S)[0]
+        self.labels[y0:y1, x0:x1] = labels
+        keep = np.zeros(count, np.uint8)
+        keep[labels[strong[inner] > 0]] = 255
+        keep[0] = 0
+        self.__keep(i, keep)
+        return keep
+
+    def __keep(self, i, keep):
+        """
+        Write the kept weak edges of a tile in `edges`.
+
+        Parameters
+        ----------
+        i : int
+            Index of the tile.
+        keep : numpy.ndarray
+            255 for each label to keep, else 0.
+        """
+        y0, y1, x0, x1 = self.tiles[i]
+        np.take(keep, self.__buffers[i][3], out=self.edges[y0:y1, x0:x1], mode="clip")
+
+    def __merge_seams(self, keeps):
+        """
+        Keep the weak edges connected to a strong edge through the seams.
+
+        The weak edges touching each other on both sides of a seam are merged (8-connectivity).
+
+        Parameters
+        ----------
+        keeps : list of numpy.ndarray
+            255 for each label to keep, for each tile. Updated.
+
+        Returns
+        -------
+        changed : set of int
+            Index of the tiles whose kept labels changed.
+        """
+        labels = self.labels
+        pairs = []
+        for x in self.col_starts[1:]:
+            left, right = labels[:, x-1], labels[:, x]
+            for d in (-1, 0, 1):
+                ys = np.flatnonzero((left[max(-d,0):self.height-max(d,0)] > 0) &
+                                    (right[max(d,0):self.height-max(-d,0)] > 0)) + max(-d,0)
+                pairs += zip(ys, np.full(len(ys), x-1), ys+d, np.full(len(ys), x))
+        for y in self.row_starts[1:]:
+            top, bottom = labels[y-1], labels[y]
+            for d in (-1, 0, 1):
+                xs = np.flatnonzero((top[max(-d,0):self.width-max(d,0)] > 0) &
+                                    (bottom[max(d,0):self.width-max(-d,0)] > 0)) + max(-d,0)
+                pairs += zip(np.full(len(xs), y-1), xs, np.full(len(xs), y), xs+d)
+        if not pairs:
+            return set()
+        cols = len(self.col_starts)
+        def node(y, x):
+            tile = (np.searchsorted(self.row_starts, y, "right")-1)*cols + np.searchsorted(self.col_starts, x, "right")-1
+            return int(tile), int(labels[y, x])
+        parent = {}
+        def find(a):
+            while parent.setdefault(a, a) != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+        for ya, xa, yb, xb in pairs:
+            parent[find(node(ya, xa))] = find(node(yb, xb))
+        kept = set(find(a) for a in parent if keeps[a[0]][a[1]])
+        changed = set()
+        for tile, label in parent:
+            if not keeps[tile][label] and find((tile, label)) in kept:
+                keeps[tile][label] = 255
+                changed.add(tile)
+        return changed
+
+    def __close(self, i, settings):
+        """
+        Close the edges of a tile.
+
+        Parameters
+        ----------
+        i : int
+            Index of the tile.
+        settings : Settings
+            The settings of the frame.
+        """
+        tile = self.tiles[i]
+        padded, inner = self.__halo(tile, self.halos[1])
+        y0, y1, x0, x1 = tile
+        closed = self.__buffers[i][4]
+        cv2.morphologyEx(self.edges[padded], cv2.MORPH_CLOSE, self.kernel, dst=closed, iterations=settings.close_iterations)
+        self.closed[y0:y1, x0:x1] = closed[inner]
+
+__preprocessors = {}
+
+def get_preprocessor(height, width, tiles=None):
+    """
+    Get the preprocessing engine of a resolution.
+
+    The engine is created at the first call, then reused.
+
+    Parameters
+    ----------
+    height : int
+        Image's height
+    width : int
+        Image's width
+    tiles : tuple of int
+        Number of rows and columns of tiles, processed by a pool of threads. None to process the whole image at once.
+
+    Returns
+    -------
+    preprocessor : Preprocessor
+        The engine for this resolution.
+    """
+    preprocessor = __preprocessors.get((height, width, tiles))
+    if preprocessor is None:
+        if tiles is None:
+            preprocessor = Preprocessor(height, width)
+        else:
+            preprocessor = TiledPreprocessor(height, width, tiles)
+        __preprocessors[(height, width, tiles)] = preprocessor
+    return preprocessor
+
+def to_gray(img):
+    """
+    Convert a camera image to the 8-bit grayscale image read by shape_recognition.
+
+    The result is the same as writing the image in a png file and reading it again,
+    without the file.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The image, e.g the amplitude image.
+
+    Returns
+    -------
+    gray : numpy.ndarray
+        The grayscale image.
+    """
+    if img.dtype == np.uint8 and img.ndim == 2:
+        return img
+    if img.dtype == np.uint16 and img.ndim == 2:
+        return (img >> 8).astype(np.uint8) #png keeps 16 bits, imread keeps the 8 high bits
+    _, data = cv2.imencode(".png", img)
+    return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
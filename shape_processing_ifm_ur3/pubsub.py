@@ -0,0 +1,261 @@
+import socket
+import struct
+import threading
+from collections import deque
+from .serialization import encode, decode
+
+HOST = "127.0.0.1"
+PORT = 30010
+QUEUE_SIZE = 8
+
+LENGTH = struct.Struct("<I")
+
+class ResultPublisher:
+    """
+    Publish the result of each frame to the local subscribers.
+
+    Each subscriber has its own bounded queue and its own sending thread.\n
+    If a subscriber is too slow and its queue is full, its oldest result is dropped :
+    the vision loop never waits for a subscriber.
+    """
+    def __init__(self, host=HOST, port=PORT, queue_size=QUEUE_SIZE):
+        """
+        Open the socket and wait for subscribers.
+
+        Parameters
+        ----------
+        host : str
+            Address to listen on.
+        port : int
+            Port to listen on. 0 to choose a free port.
+        queue_size : int
+            Maximal number of results waiting for each subscriber.
+        """
+        self.queue_size = queue_size
+        self.subscriptions = []
+        self.__lock = threading.Lock()
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind((host, port))
+        self.__server.listen()
+        self.address = self.__server.getsockname()
+        self.__running = True
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def publish(self, data):
+        """
+        Send an encoded result to all the subscribers.
+
+        Parameters
+        ----------
+        data : bytes
+            The encoded result.
+        """
+        message = LENGTH.pack(len(data)) + data
+        with self.__lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(message)
+
+    def publish_detection(self, detection, dimensions=None, frame_id=0, timestamp=None):
+        """
+        Encode and send the result of a frame.
+
+        Parameters
+        ----------
+        detection : Detection
+            The detected shapes.
+        dimensions : tuple of float
+            Height, length and width of the object. None if unknown.
+        frame_id : int
+            Number of the frame.
+        timestamp : float
+            Time of the frame, in seconds. None for now.
+        """
+        self.publish(encode(detection, dimensions, frame_id, timestamp))
+
+    def close(self):
+        """
+        Stop accepting subscribers and disconnect them.
+        """
+        self.__running = False
+        self.__server.close()
+        with self.__lock:
+            subscriptions = list(self.subscriptions)
+            self.subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.close()
+
+    def __accept(self):
+        """
+        Accept the subscribers.
+        """
+        while self.__running:
+            try:
+                conn, _ = self.__server.accept()
+            except OSError:
+                return
+            subscription = Subscription(conn, self.queue_size, self.__remove)
+            with self.__lock:
+                self.subscriptions.append(subscription)
+
+    def __remove(self, subscription):
+        """
+        Forget a disconnected subscriber.
+
+        Parameters
+        ----------
+        subscription : Subscription
+            The subscriber.
+        """
+        with self.__lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+class Subscription:
+    """
+    A subscriber of a ResultPublisher, with its queue and its sending thread.
+    """
+    def __init__(self, conn, queue_size, on_close):
+        """
+        Start sending to the subscriber.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            Connection to the subscriber.
+        queue_size : int
+            Maximal number of waiting results.
+        on_close : function
+            Called with the subscription when it's closed.
+        """
+        self.conn = conn
+        self.dropped = 0
+        self.sent = 0
+        self.__queue = deque(maxlen=queue_size)
+        self.__ready = threading.Condition()
+        self.__on_close = on_close
+        self.__running = True
+        threading.Thread(target=self.__send, daemon=True).start()
+
+    def push(self, message):
+        """
+        Add a message to the queue. The oldest one is dropped if the queue is full.
+
+        Parameters
+        ----------
+        message : bytes
+            The framed message.
+        """
+        with self.__ready:
+            if len(self.__queue) == self.__queue.maxlen:
+                self.dropped += 1
+            self.__queue.append(message)
+            self.__ready.notify()
+
+    def close(self):
+        """
+        Stop sending and close the connection.
+        """
+        with self.__ready:
+            self.__running = False
+            self.__ready.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+    def __send(self):
+        """
+        Send the queued messages.
+        """
+        while True:
+            with self.__ready:
+                while self.__running and not self.__queue:
+                    self.__ready.wait()
+                if not self.__running:
+                    return
+                message = self.__queue.popleft()
+            try:
+                self.conn.sendall(message)
+                self.sent += 1
+            except OSError:
+                self.close()
+                self.__on_close(self)
+                return
+
+class ResultSubscriber:
+    """
+    Receive the results of a ResultPublisher.
+    """
+    def __init__(self, host=HOST, port=PORT, timeout=None):
+        """
+        Connect to the publisher.
+
+        Parameters
+        ----------
+        host : str
+            Publisher's address.
+        port : int
+            Publisher's port.
+        timeout : float
+            Timeout of receive, in seconds. None to wait forever.
+        """
+        self.sock = socket.create_connection((host, port))
+        self.sock.settimeout(timeout)
+
+    def receive(self):
+        """
+        Wait for the next result.
+
+        Returns
+        -------
+        result : FrameResult
+            The decoded result. Or None if the publisher is closed.
+        """
+        header = self.__receive(LENGTH.size)
+        if header is None:
+            return None
+        data = self.__receive(LENGTH.unpack(header)[0])
+        if data is None:
+            return None
+        return decode(data)
+
+    def __iter__(self):
+        """
+        Iterate over the results until the publisher is closed.
+        """
+        result = self.receive()
+        while result is not None:
+            yield result
+            result = self.receive()
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.sock.close()
+
+    def __receive(self, size):
+        """
+        Receive exactly size bytes.
+
+        Parameters
+        ----------
+        size : int
+            Number of bytes.
+
+        Returns
+        -------
+        data : bytearray
+            The bytes. Or None if the connection is closed.
+        """
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            nb = self.sock.recv_into(view[received:])
+            if nb == 0:
+                return None
+            received += nb
+        return data
@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+from .preprocessing import get_preprocessor
+
+ROI_MARGIN = 16
+
+__levels = {}
+
+def coarse_to_fine(img, levels, minimal_area):
+    """
+    Find the shapes on a small image, then get their contours on the full image.
+
+    The candidates are found on a downsampled level of the image pyramid.\n
+    The full resolution processing is only done in a region around each candidate,
+    so the contours are the same as with the whole image, except for shapes too small to be seen on the small image.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The grayscale image.
+    levels : int
+        Number of pyramid levels. Each level halves the width and the height.
+    minimal_area : float
+        Smallest area of a shape, at full resolution.
+
+    Returns
+    -------
+    closed : numpy.ndarray
+        The image whose shapes we want to detect, without holes. Black outside the regions.
+    contours : list
+        Contours of the shapes, in full image coordinates.
+    """
+    height, width = img.shape
+    coarse = __downsample(img, levels)
+    scale = 2**levels
+    coarse_height, coarse_width = coarse.shape
+    coarse_preprocessor = get_preprocessor(coarse_height, coarse_width)
+    coarse_closed = coarse_preprocessor.fill_holes(coarse_preprocessor.process(coarse))
+    coarse_contours, _ = cv2.findContours(coarse_closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    rois = []
+    for cont in coarse_contours:
+        x, y, w, h = cv2.boundingRect(cont)
+        if (w+1)*(h+1)*scale*scale < minimal_area: #too small, even with one more pixel per side
+            continue
+        x0 = max(x*scale - ROI_MARGIN, 0)
+        y0 = max(y*scale - ROI_MARGIN, 0)
+        x1 = min((x+w)*scale + ROI_MARGIN, width)
+        y1 = min((y+h)*scale + ROI_MARGIN, height)
+        rois.append([x0, y0, x1, y1])
+    rois = __merge_rois(rois)
+
+    preprocessor = get_preprocessor(height, width)
+    preprocessor.closed.fill(0)
+    contours = []
+    for x0, y0, x1, y1 in rois:
+        roi = (x0, y0, x1-x0, y1-y0)
+        preprocessor.process(img, roi)
+        closed = preprocessor.fill_holes(preprocessor.closed, roi)
+        roi_contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+        for cont in roi_contours:
+            if not __cut_by_roi(cont, x0, y0, x1, y1, width, height):
+                contours.append(cont)
+    # Same order as findContours on the whole image : from the last starting point to the first.
+    contours.sort(key=lambda cont: (cont[0][0][1], cont[0][0][0]), reverse=True)
+    return preprocessor.closed, contours
+
+def __downsample(img, levels):
+    """
+    Downsample the image with pyrDown.
+
+    The buffers of each level are allocated at the first call, then reused.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The grayscale image.
+    levels : int
+        Number of pyramid levels.
+
+    Returns
+    -------
+    coarse : numpy.ndarray
+        The smallest level.
+    """
+    height, width = img.shape
+    buffers = __levels.get((height, width, levels))
+    if buffers is None:
+        buffers = []
+        for _ in range(levels):
+            height, width = (height+1)//2, (width+1)//2
+            buffers.append(np.empty((height, width), np.uint8))
+        __levels[img.shape + (levels,)] = buffers
+    for buffer in buffers:
+        img = cv2.pyrDown(img, dst=buffer, dstsize=(buffer.shape[1], buffer.shape[0]))
+    return img
+
+def __merge_rois(rois):
+    """
+    Merge the overlapping regions.
+
+    Parameters
+    ----------
+    rois : list
+        Regions [x0, y0, x1, y1].
+
+    Returns
+    -------
+    merged : list
+        Regions that don't overlap.
+    """
+    merged = []
+    for roi in rois:
+        overlap = True
+        while overlap:
+            overlap = False
+            for other in merged:
+                if roi[0] < other[2] and other[0] < roi[2] and roi[1] < other[3] and other[1] < roi[3]:
+                    merged.remove(other)
+                    roi = [min(roi[0], other[0]), min(roi[1], other[1]), max(roi[2], other[2]), max(roi[3], other[3])]
+                    overlap = True
+                    break
+        merged.append(roi)
+    return merged
+
+def __cut_by_roi(cont, x0, y0, x1, y1, width, height):
+    """
+    Check if a contour is cut by the region's edges.
+
+    A shape cut by a region's edge (that is not an image's edge) belongs to another region.
+
+    Parameters
+    ----------
+    cont : numpy.ndarray
+        Contour, in full image coordinates.
+    x0, y0, x1, y1 : int
+        The region.
+    width : int
+        Image's width
+    height : int
+        Image's height
+
+    Returns
+    -------
+    cut : bool
+        True if the contour touches an edge of the region inside the image.
+    """
+    x, y, w, h = cv2.boundingRect(cont)
+    return (x <= x0 and x0 > 0) or (y <= y0 and y0 > 0) or \
+        (x+w >= x1 and x1 < width) or (y+h >= y1 and y1 < height)
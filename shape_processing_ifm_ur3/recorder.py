@@ -0,0 +1,225 @@
+import os
+import time
+import struct
+import numpy as np
+
+MAGIC = b"SPFR"
+VERSION = 1
+
+# magic, version, number of slots, image's height, image's width, maximal result size,
+# amplitude dtype, distance dtype
+HEADER = struct.Struct("<4sHxxIIII16s16s")
+HEADER_SIZE = 64
+
+MAX_RESULT_SIZE = 4096
+
+class FlightRecorder:
+    """
+    Black box that keeps the last frames and their results on disk.
+
+    The frames are written in a fixed-size ring file, mapped in memory : writing a frame is only a copy in memory,
+    and the system writes it to the disk.\n
+    There is only one writer (the capture thread) and no lock. A slot is published by writing its sequence number last,
+    so a slot being written is never read.\n
+    For e.g at 20 frames per second, 10 minutes are 12000 slots.
+
+    When a pick fails, freeze the recorder and export the ring.
+    """
+    def __init__(self, path, nb_slots, height, width, amp_dtype=np.float32, dist_dtype=np.float32,
+                 max_result_size=MAX_RESULT_SIZE):
+        """
+        Open the ring file.
+
+        If the file already exists with the same layout, the recording continues after its last frame.
+
+        Parameters
+        ----------
+        path : str
+            Path of the ring file.
+        nb_slots : int
+            Number of frames kept.
+        height : int
+            Image's height
+        width : int
+            Image's width
+        amp_dtype : numpy.dtype
+            Type of the amplitude image.
+        dist_dtype : numpy.dtype
+            Type of the distance image.
+        max_result_size : int
+            Maximal size of an encoded result, in bytes. Bigger results are not recorded.
+        """
+        self.path = path
+        self.frozen = False
+        self.skipped_results = 0
+        header = HEADER.pack(MAGIC, VERSION, nb_slots, height, width, max_result_size,
+                             np.dtype(amp_dtype).str.encode(), np.dtype(dist_dtype).str.encode())
+        self.__dtype = slot_dtype(height, width, amp_dtype, dist_dtype, max_result_size)
+        mode = "w+"
+        if os.path.exists(path) and os.path.getsize(path) == HEADER_SIZE + nb_slots*self.__dtype.itemsize:
+            with open(path, "rb") as ring:
+                if ring.read(HEADER.size) == header:
+                    mode = "r+"
+        if mode == "w+":
+            with open(path, "wb") as ring:
+                ring.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.slots = np.memmap(path, self.__dtype, "r+", HEADER_SIZE, (nb_slots,))
+        self.__seq = int(self.slots["seq"].max())
+        self.__index = (int(self.slots["seq"].argmax())+1) % nb_slots if self.__seq else 0
+
+    @property
+    def nb_slots(self):
+        """
+        int : Number of frames kept.
+        """
+        return len(self.slots)
+
+    @property
+    def last_seq(self):
+        """
+        int : Sequence number of the last frame recorded. 0 before the first frame.
+        """
+        return self.__seq
+
+    def record(self, amplitude, distance, result=b"", timestamp=None):
+        """
+        Write a frame in the ring.
+
+        Parameters
+        ----------
+        amplitude : numpy.ndarray
+            The amplitude image.
+        distance : numpy.ndarray
+            The distance image.
+        result : bytes
+            The encoded result of the frame (serialization.encode).
+        timestamp : float
+            Time of the frame, in seconds. None for now.
+
+        Returns
+        -------
+        seq : int
+            Sequence number of the frame. Or None if the recorder is frozen.
+        """
+        if self.frozen:
+            return None
+        if timestamp is None:
+            timestamp = time.time()
+        i = self.__index
+        slots = self.slots
+        slots["seq"][i] = 0 #the slot is being written
+        slots["timestamp"][i] = timestamp
+        slots["amplitude"][i] = amplitude
+        slots["distance"][i] = distance
+        if len(result) > slots["result"].shape[1]:
+            self.skipped_results += 1
+            result = b""
+        slots["result_size"][i] = len(result)
+        slots["result"][i, :len(result)] = np.frombuffer(result, np.uint8)
+        self.__seq += 1
+        slots["seq"][i] = self.__seq #publish the slot
+        self.__index = (i+1) % len(slots)
+        return self.__seq
+
+    def freeze(self):
+        """
+        Stop recording, to keep the frames before a failure.
+        """
+        self.frozen = True
+
+    def unfreeze(self):
+        """
+        Record again.
+        """
+        self.frozen = False
+
+    def export(self, path):
+        """
+        Save the recorded frames, from the oldest to the newest.
+
+        Freeze the recorder before, so the frames are not overwritten during the export.
+
+        Parameters
+        ----------
+        path : str
+            Path of the .npz file.
+        """
+        np.savez(path, **read_slots(self.slots))
+
+    def flush(self):
+        """
+        Write the ring to the disk now.
+        """
+        self.slots.flush()
+
+def slot_dtype(height, width, amp_dtype, dist_dtype, max_result_size):
+    """
+    Get the layout of a slot.
+
+    Parameters
+    ----------
+    height : int
+        Image's height
+    width : int
+        Image's width
+    amp_dtype : numpy.dtype
+        Type of the amplitude image.
+    dist_dtype : numpy.dtype
+        Type of the distance image.
+    max_result_size : int
+        Maximal size of an encoded result, in bytes.
+
+    Returns
+    -------
+    dtype : numpy.dtype
+        The slot's structure.
+    """
+    return np.dtype([("seq", "<u8"), ("timestamp", "<f8"), ("result_size", "<u4"), ("pad", "<u4"),
+                     ("amplitude", np.dtype(amp_dtype), (height, width)),
+                     ("distance", np.dtype(dist_dtype), (height, width)),
+                     ("result", "u1", (max_result_size,))])
+
+def read_ring(path):
+    """
+    Read a ring file, e.g after a crash.
+
+    Parameters
+    ----------
+    path : str
+        Path of the ring file.
+
+    Returns
+    -------
+    frames : dict
+        seq, timestamp, amplitude, distance, result_size and result arrays, from the oldest to the newest frame.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a ring file.
+    """
+    with open(path, "rb") as ring:
+        magic, version, nb_slots, height, width, max_result_size, amp_dtype, dist_dtype = HEADER.unpack(ring.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("This is not a ring file of this version.")
+    dtype = slot_dtype(height, width, amp_dtype.rstrip(b"\0").decode(), dist_dtype.rstrip(b"\0").decode(), max_result_size)
+    return read_slots(np.memmap(path, dtype, "r", HEADER_SIZE, (nb_slots,)))
+
+def read_slots(slots):
+    """
+    Get the published slots, from the oldest to the newest.
+
+    Parameters
+    ----------
+    slots : numpy.ndarray
+        The ring.
+
+    Returns
+    -------
+    frames : dict
+        seq, timestamp, amplitude, distance, result_size and result arrays.
+    """
+    seq = np.array(slots["seq"])
+    order = np.argsort(seq, kind="stable")
+    order = order[seq[order] > 0]
+    return {name: np.array(slots[name][order]) for name in ("seq", "timestamp", "amplitude", "distance", "result_size", "result")}
@@ -0,0 +1,506 @@
+import sys
+import time
+import socket
+import argparse
+import threading
+import numpy as np
+from .settings import get_settings
+
+PORT = 30003 #realtime interface, one packet every 8 ms (CB3)
+PROGRAM_RUNNING = 2 #program state : 1 stopped, 2 running, 4 paused
+RECONNECT_DELAY = 1.0 #s
+STATE_SIZE = 1108 #bytes, packet of the software 3.5 to 3.9. The later ones add fields at the end
+
+# Fields of the realtime packet, big-endian, at their offsets. The fields used are the same since the software 3.2.
+STATE_DTYPE = np.dtype({"names": ["size", "time", "q_actual", "qd_actual", "tool_vector", "tcp_speed",
+                                  "robot_mode", "program_state"],
+                        "formats": [">i4", ">f8", (">f8", 6), (">f8", 6), (">f8", 6), (">f8", 6), ">f8", ">f8"],
+                        "offsets": [0, 4, 252, 300, 444, 492, 756, 1052],
+                        "itemsize": 1060})
+
+class RobotState:
+    """
+    State of the robot given by one realtime packet.
+
+    The fields are read-only views on the packet, not copies.
+    """
+    __slots__ = ("packet", "received", "__fields")
+
+    def __init__(self, packet, received=None):
+        """
+        Parse a packet.
+
+        Parameters
+        ----------
+        packet : bytes or bytearray
+            The whole packet, with its size.
+        received : float
+            Time of reception, time.monotonic(). None for now.
+
+        Raises
+        ------
+        ValueError
+            If the packet is too small or its size doesn't match.
+        """
+        if len(packet) < STATE_DTYPE.itemsize:
+            raise ValueError("The packet is too small : " + str(len(packet)) + " bytes.")
+        fields = np.frombuffer(packet, STATE_DTYPE, count=1)
+        fields.flags.writeable = False
+        if fields["size"][0] != len(packet):
+            raise ValueError("The packet's size doesn't match : " + str(fields["size"][0]) + " for "
+                             + str(len(packet)) + " bytes.")
+        self.packet = packet
+        self.received = time.monotonic() if received is None else received
+        self.__fields = fields[0]
+
+    @property
+    def time(self):
+        """
+        float : Time since the controller started, in seconds.
+        """
+        return float(self.__fields["time"])
+
+    @property
+    def joints(self):
+        """
+        numpy.ndarray : Actual joint positions, in rad.
+        """
+        return self.__fields["q_actual"]
+
+    @property
+    def joint_speeds(self):
+        """
+        numpy.ndarray : Actual joint velocities, in rad/s.
+        """
+        return self.__fields["qd_actual"]
+
+    @property
+    def tcp_pose(self):
+        """
+        numpy.ndarray : Actual TCP pose (x, y, z, rx, ry, rz), in m and rad.
+        """
+        return self.__fields["tool_vector"]
+
+    @property
+    def tcp_speed(self):
+        """
+        numpy.ndarray : Actual TCP speed, in m/s and rad/s.
+        """
+        return self.__fields["tcp_speed"]
+
+    @property
+    def robot_mode(self):
+        """
+        int : Robot's mode.
+        """
+        return int(self.__fields["robot_mode"])
+
+    @property
+    def program_state(self):
+        """
+        int : Program's state. 1 stopped, 2 running, 4 paused.
+        """
+        return int(self.__fields["program_state"])
+
+    @property
+    def running(self):
+        """
+        bool : True if a program runs.
+        """
+        return self.program_state == PROGRAM_RUNNING
+
+    @property
+    def moving(self):
+        """
+        bool : True if a joint moves faster than 0.001 rad/s.
+        """
+        return bool(np.abs(self.joint_speeds).max() > 1e-3)
+
+class StateReader:
+    """
+    Read the realtime state of the robot continuously.
+
+    The latest state is replaced at each packet, and never modified : reading it needs no lock.
+    """
+    def __init__(self, host=None, port=PORT, timeout=5.0):
+        """
+        Create the reader. It's connected at start.
+
+        Parameters
+        ----------
+        host : str
+            Robot's IP. None for the robot_host of the settings, read at each connection.
+        port : int
+            Port of the realtime interface.
+        timeout : float
+            Timeout to connect and receive, in seconds.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.packets = 0
+        self.program_ends = 0 #number of programs seen finishing
+        self.errors = 0
+        self.last_error = None
+        self.state = None #latest RobotState, None before the first packet
+        self.__condition = threading.Condition()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.__sock = None
+
+    def start(self):
+        """
+        Start reading in a thread.
+        """
+        if self.__thread is None:
+            self.__stopped.clear()
+            self.__thread = threading.Thread(target=self.__read, daemon=True)
+            self.__thread.start()
+
+    def close(self):
+        """
+        Stop reading.
+        """
+        self.__stopped.set()
+        sock = self.__sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def wait(self, predicate, timeout=None):
+        """
+        Wait for a state.
+
+        Parameters
+        ----------
+        predicate : function
+            Called with each new RobotState. True when it's the awaited state.
+        timeout : float
+            Time to wait, in seconds. None to wait without limit.
+
+        Returns
+        -------
+        state : RobotState
+            The awaited state. None if the timeout expired.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                state = self.state
+                if state is not None and predicate(state):
+                    return state
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.__condition.wait(remaining)
+
+    def wait_program_end(self, timeout=None, ends=None):
+        """
+        Wait until a program is finished.
+
+        The program may be finished before the call : take program_ends before sending it, and give it as ends.
+
+        Parameters
+        ----------
+        timeout : float
+            Time to wait, in seconds. None to wait without limit.
+        ends : int
+            program_ends before the program. None for now.
+
+        Returns
+        -------
+        state : RobotState
+            The first state after the program. None if the timeout expired.
+        """
+        if ends is None:
+            ends = self.program_ends
+        return self.wait(lambda state: self.program_ends > ends, timeout)
+
+    def __read(self):
+        """
+        Receive the packets, and reconnect if the connection is lost.
+        """
+        while not self.__stopped.is_set():
+            try:
+                host = get_settings().robot_host if self.host is None else self.host
+                with socket.create_connection((host, self.port), self.timeout) as sock:
+                    self.__sock = sock
+                    while not self.__stopped.is_set():
+                        self.__update(RobotState(receive_packet(sock)))
+            except (OSError, ValueError) as e:
+                if self.__stopped.is_set():
+                    return
+                print(e)
+                self.errors += 1
+                self.last_error = str(e)
+                self.__stopped.wait(RECONNECT_DELAY)
+            finally:
+                self.__sock = None
+
+    def __update(self, state):
+        """
+        Replace the latest state, and wake up the waiting threads.
+
+        Parameters
+        ----------
+        state : RobotState
+            The new state.
+        """
+        previous = self.state
+        self.state = state
+        self.packets += 1
+        if previous is not None and previous.running and not state.running:
+            self.program_ends += 1
+        with self.__condition:
+            self.__condition.notify_all()
+
+class ReplayServer:
+    """
+    Serve recorded packets like the realtime interface, to test without the robot.
+
+    Each client gets the packets from the first one, at the given rate. The last packet is repeated at the end.
+    """
+    def __init__(self, packets, host="127.0.0.1", port=0, period=0.008):
+        """
+        Open the server.
+
+        Parameters
+        ----------
+        packets : list or str
+            The packets, or the path of a recording.
+        host : str
+            Address of the server.
+        port : int
+            Port of the server. 0 to choose a free port.
+        period : float
+            Time between two packets, in seconds.
+        """
+        self.packets = load_packets(packets) if isinstance(packets, str) else list(packets)
+        self.period = period
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server.bind((host, port))
+        self.__server.listen()
+        self.address = self.__server.getsockname()
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def close(self):
+        """
+        Close the server.
+        """
+        self.__server.close()
+
+    def __accept(self):
+        """
+        Accept the clients.
+        """
+        while True:
+            try:
+                conn, _ = self.__server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.__serve, args=(conn,), daemon=True).start()
+
+    def __serve(self, conn):
+        """
+        Send the packets to a client.
+
+        Parameters
+        ----------
+        conn : socket.socket
+            Connection to the client.
+        """
+        with conn:
+            try:
+                next_time = time.monotonic()
+                i = 0
+                while True:
+                    conn.sendall(self.packets[min(i, len(self.packets)-1)])
+                    i += 1
+                    next_time += self.period
+                    time.sleep(max(next_time - time.monotonic(), 0))
+            except OSError:
+                return
+
+def state_packet(t=0.0, joints=None, tcp_pose=None, program_state=1, joint_speeds=None, size=STATE_SIZE):
+    """
+    Build a realtime packet. The other fields are 0.
+
+    Parameters
+    ----------
+    t : float
+        Time since the controller started, in seconds.
+    joints : list
+        Joint positions, in rad.
+    tcp_pose : list
+        TCP pose, in m and rad.
+    program_state : int
+        Program's state.
+    joint_speeds : list
+        Joint velocities, in rad/s.
+    size : int
+        Size of the packet, in bytes.
+
+    Returns
+    -------
+    packet : bytes
+        The packet.
+    """
+    packet = bytearray(size)
+    fields = np.frombuffer(packet, STATE_DTYPE, count=1)
+    fields["size"] = size
+    fields["time"] = t
+    fields["program_state"] = program_state
+    for name, value in (("q_actual", joints), ("qd_actual", joint_speeds), ("tool_vector", tcp_pose)):
+        if value is not None:
+            fields[name] = value
+    return bytes(packet)
+
+def record(path, seconds=10.0, host=None, port=PORT):
+    """
+    Record the realtime packets in a file, as they're received.
+
+    Parameters
+    ----------
+    path : str
+        Path of the recording.
+    seconds : float
+        Duration, in seconds.
+    host : str
+        Robot's IP. None for the robot_host of the settings.
+    port : int
+        Port of the realtime interface.
+
+    Returns
+    -------
+    packets : int
+        Number of packets recorded.
+    """
+    count = 0
+    end = time.monotonic() + seconds
+    if host is None:
+        host = get_settings().robot_host
+    with socket.create_connection((host, port), 5.0) as sock, open(path, "wb") as f:
+        while time.monotonic() < end:
+            f.write(receive_packet(sock))
+            count += 1
+    return count
+
+def load_packets(path):
+    """
+    Load a recording.
+
+    Parameters
+    ----------
+    path : str
+        Path of the recording.
+
+    Returns
+    -------
+    packets : list
+        The packets.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    packets = []
+    offset = 0
+    while offset + 4 <= len(data):
+        size = int.from_bytes(data[offset:offset+4], "big")
+        if size < 4:
+            raise ValueError("Bad packet size at " + str(offset) + " : " + str(size))
+        packets.append(data[offset:offset+size])
+        offset += size
+    return packets
+
+def receive_packet(sock):
+    """
+    Receive one packet.
+
+    Parameters
+    ----------
+    sock : socket.socket
+        Connection to the realtime interface.
+
+    Returns
+    -------
+    packet : bytearray
+        The whole packet, with its size.
+
+    Raises
+    ------
+    ConnectionError
+        If the connection is closed.
+    ValueError
+        If the size is not a packet's size.
+    """
+    header = __receive_exactly(sock, bytearray(4))
+    size = int.from_bytes(header, "big")
+    if size < STATE_DTYPE.itemsize or size > 65536:
+        raise ValueError("Bad packet size : " + str(size))
+    packet = bytearray(size)
+    packet[:4] = header
+    return __receive_exactly(sock, packet, 4)
+
+def __receive_exactly(sock, buffer, start=0):
+    """
+    Fill a buffer from the socket.
+
+    Parameters
+    ----------
+    sock : socket.socket
+        The connection.
+    buffer : bytearray
+        The buffer.
+    start : int
+        Offset of the first byte to receive.
+
+    Returns
+    -------
+    buffer : bytearray
+        The filled buffer.
+
+    Raises
+    ------
+    ConnectionError
+        If the connection is closed.
+    """
+    view = memoryview(buffer)
+    while start < len(buffer):
+        received = sock.recv_into(view[start:])
+        if not received:
+            raise ConnectionError("The robot closed the connection.")
+        start += received
+    return buffer
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Read the realtime state of the robot, record it or replay a recording.")
+    parser.add_argument("--host", default=None, help="Robot's IP, or the address of the replay. Default : the settings' robot, 127.0.0.1 for the replay.")
+    parser.add_argument("--port", type=int, default=PORT, help="Port of the realtime interface.")
+    parser.add_argument("--record", default=None, help="Record the packets in this file.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of the recording, in seconds.")
+    parser.add_argument("--replay", default=None, help="Serve this recording on --port.")
+    args = parser.parse_args()
+    try:
+        if args.record is not None:
+            print(record(args.record, args.seconds, args.host, args.port), "packets recorded in", args.record)
+            sys.exit(0)
+        if args.replay is not None:
+            server = ReplayServer(args.replay, args.host or "127.0.0.1", args.port)
+            print("Replaying", len(server.packets), "packets on", server.address)
+            threading.Event().wait()
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    reader = StateReader(args.host, args.port)
+    reader.start()
+    while True:
+        state = reader.wait(lambda state: True, 5.0)
+        if state is not None:
+            print(round(state.time, 3), "running" if state.running else "stopped",
+                  "pose", np.round(state.tcp_pose, 4), "joints", np.round(state.joints, 4))
+        time.sleep(0.5)
@@ -0,0 +1,112 @@
+import time
+import struct
+import numpy as np
+from collections import namedtuple
+from .Shape import Shape
+
+MAGIC = b"SPRF"
+VERSION = 1
+
+# magic, version, wanted shape, selected index (-1 if none), number of shapes,
+# frame id, timestamp, object height, length and width (NaN if unknown), number of points
+HEADER = struct.Struct("<4sHBxhHQdfffI")
+
+# One fixed-size record per shape. The contour points are stored after the records, as int16 (x, y).
+RECORD = np.dtype([("shape", "u1"), ("pad", "u1"), ("nb_points", "<u2"), ("offset", "<u4"),
+                   ("center_x", "<f4"), ("center_y", "<f4"), ("width", "<f4"), ("height", "<f4"),
+                   ("angle", "<f4")])
+
+FrameResult = namedtuple("FrameResult", ["frame_id", "timestamp", "shape", "index", "dimensions", "records", "contours"])
+FrameResult.__doc__ = """
+Decoded result of a frame.
+
+frame_id : int\n
+timestamp : float\n
+shape : Shape, the wanted shape.\n
+index : int, index of the detected shape in records. None if it's not found.\n
+dimensions : tuple of float, height, length and width of the object. None if unknown.\n
+records : numpy.ndarray, one record (RECORD) per shape.\n
+contours : list of numpy.ndarray, contour of each shape. Views on the encoded data.
+"""
+
+def encode(detection, dimensions=None, frame_id=0, timestamp=None):
+    """
+    Encode the result of a frame.
+
+    Parameters
+    ----------
+    detection : Detection
+        The detected shapes.
+    dimensions : tuple of float
+        Height, length and width of the object, given by shape_size. None if unknown.
+    frame_id : int
+        Number of the frame.
+    timestamp : float
+        Time of the frame, in seconds. None for now.
+
+    Returns
+    -------
+    data : bytes
+        The encoded result.
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if dimensions is None or None in dimensions:
+        dimensions = (np.nan, np.nan, np.nan)
+    candidates = detection.candidates
+    nb = len(candidates)
+    records = np.zeros(nb, RECORD)
+    points = np.empty((0, 2), "<i2")
+    if nb:
+        approx = [features.approx.reshape(-1, 2) for features in candidates]
+        nb_points = np.fromiter((len(a) for a in approx), np.int64, nb)
+        records["shape"] = detection.detected_list
+        records["nb_points"] = nb_points
+        records["offset"] = np.cumsum(nb_points) - nb_points
+        rects = np.array([(x, y, w, h, angle) for (x, y), (w, h), angle in
+                          (features.min_area_rect for features in candidates)], np.float32)
+        records["center_x"] = rects[:,0]
+        records["center_y"] = rects[:,1]
+        records["width"] = rects[:,2]
+        records["height"] = rects[:,3]
+        records["angle"] = rects[:,4]
+        points = np.concatenate(approx).astype("<i2")
+    index = -1 if detection.index is None else detection.index
+    header = HEADER.pack(MAGIC, VERSION, detection.shape.value, index, nb, frame_id, timestamp,
+                         dimensions[0], dimensions[1], dimensions[2], len(points))
+    return b"".join((header, records.tobytes(), points.tobytes()))
+
+def decode(data):
+    """
+    Decode the result of a frame.
+
+    The records and the contours are not copied : they are views on the data.
+
+    Parameters
+    ----------
+    data : bytes
+        The encoded result.
+
+    Returns
+    -------
+    result : FrameResult
+        The decoded result.
+
+    Raises
+    ------
+    ValueError
+        If the data is not an encoded result, or has another version.
+    """
+    magic, version, shape, index, nb, frame_id, timestamp, height, length, width, nb_points = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("This is not an encoded frame result.")
+    if version != VERSION:
+        raise ValueError("Unsupported frame result version : " + str(version))
+    offset = HEADER.size
+    records = np.frombuffer(data, RECORD, nb, offset)
+    offset += nb*RECORD.itemsize
+    points = np.frombuffer(data, "<i2", nb_points*2, offset).reshape(-1, 1, 2)
+    contours = [points[start:start+count] for start, count in
+                zip(records["offset"].tolist(), records["nb_points"].tolist())]
+    dimensions = None if np.isnan(height) else (height, length, width)
+    return FrameResult(frame_id, timestamp, Shape(shape), None if index < 0 else index, dimensions, records, contours)
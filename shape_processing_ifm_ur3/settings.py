@@ -0,0 +1,263 @@
+import os
+import json
+import time
+from dataclasses import dataclass, fields, asdict
+from typing import Optional, Tuple
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Tuning parameters of the cell.
+
+    The processing reads the current settings (get_settings) at each frame. A new Settings replaces the whole
+    object, so a frame never sees half of a change.\n
+    The values are checked when the object is created : a bad file never replaces the current settings.
+    """
+    blur_size: Tuple[int, int] = (5, 5)         # Gaussian kernel, odd sizes
+    blur_sigma: float = 1.0
+    canny_low: int = 150
+    canny_high: int = 190
+    close_iterations: int = 3
+    approx_epsilon: float = 0.04                # precision of approxPolyDP, fraction of the perimeter
+    minimal_area: float = 200.0                 # pixels, smaller shapes are noise
+    maximal_area_margin: float = 2000.0         # pixels, larger shapes (frame size - margin) are the background
+    square_tolerance: float = 0.1               # a square's aspect ratio is 1 +- tolerance
+    circle_margin: float = 1.0                  # pixels removed from the enclosing circle's radius
+    ellipse_margin: float = 100.0               # pixels removed from the fitted ellipse's area
+    field_of_view: float = 40.0                 # degrees, horizontal field of view of the camera
+    depth_frames: int = 1                       # distance images averaged for the height, 1 for a single image
+    open_gripper: int = 75                      # mm
+    close_gripper: int = 45                     # mm
+    force_gripper: int = 40                     # N
+    drop_pose: Optional[Tuple[float, ...]] = None # rad, joints of the drop-off, out of the camera's view. None to hold the object
+    robot_host: str = "149.201.218.149"
+    robot_port: int = 30001
+
+    def __post_init__(self):
+        """
+        Check the values. The integers are accepted for the floats, and the lists for the tuples.
+        None is accepted for the optional values.
+
+        Raises
+        ------
+        ValueError
+            If a value has a bad type or is out of range.
+        """
+        for field in fields(self):
+            value = getattr(self, field.name)
+            kind = field.type
+            if type(None) in getattr(kind, "__args__", ()): #Optional
+                if value is None:
+                    continue
+                kind = kind.__args__[0]
+            expected = tuple if getattr(kind, "__origin__", None) is tuple else kind
+            if expected is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            if expected is tuple and isinstance(value, list):
+                value = tuple(value)
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError(field.name + " must be of type " + expected.__name__ + ", not " + repr(value))
+            object.__setattr__(self, field.name, value)
+        if len(self.blur_size) != 2 or any(not isinstance(n, int) or n <= 0 or n % 2 == 0 for n in self.blur_size):
+            raise ValueError("blur_size must be 2 odd positive integers, not " + repr(self.blur_size))
+        if self.drop_pose is not None:
+            if len(self.drop_pose) != 6 or any(isinstance(j, bool) or not isinstance(j, (int, float)) for j in self.drop_pose):
+                raise ValueError("drop_pose must be 6 joint positions, not " + repr(self.drop_pose))
+            object.__setattr__(self, "drop_pose", tuple(float(j) for j in self.drop_pose))
+        if not 0 <= self.canny_low <= self.canny_high:
+            raise ValueError("The Canny thresholds must be 0 <= canny_low <= canny_high.")
+        if self.close_iterations < 0 or self.blur_sigma < 0:
+            raise ValueError("close_iterations and blur_sigma can't be negative.")
+        if not 0 < self.approx_epsilon < 1:
+            raise ValueError("approx_epsilon must be between 0 and 1.")
+        if self.depth_frames < 1:
+            raise ValueError("depth_frames must be at least 1.")
+        if not 0 < self.field_of_view < 180:
+            raise ValueError("field_of_view must be between 0 and 180 degrees.")
+        if not 0 < self.robot_port < 65536:
+            raise ValueError("robot_port must be between 1 and 65535.")
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Create the settings from a dictionary. The missing values are the defaults.
+
+        Parameters
+        ----------
+        values : dict
+            The values. e.g {"canny_low": 120}
+
+        Returns
+        -------
+        settings : Settings
+            The settings.
+
+        Raises
+        ------
+        ValueError
+            If a key is unknown, or a value is bad.
+        """
+        names = set(field.name for field in fields(cls))
+        unknown = sorted(set(values) - names)
+        if unknown:
+            raise ValueError("Unknown settings : " + ", ".join(unknown))
+        return cls(**values)
+
+    def to_dict(self):
+        """
+        Get the values.
+
+        Returns
+        -------
+        values : dict
+            The values, as saved in a file.
+        """
+        values = asdict(self)
+        values["blur_size"] = list(self.blur_size)
+        if self.drop_pose is not None:
+            values["drop_pose"] = list(self.drop_pose)
+        return values
+
+__current = Settings()
+
+def get_settings():
+    """
+    Get the current settings.
+
+    Returns
+    -------
+    settings : Settings
+        The current settings. Never modified : a change replaces the object.
+    """
+    return __current
+
+def set_settings(settings):
+    """
+    Replace the current settings. They apply from the next frame : call it between two frames.
+
+    Parameters
+    ----------
+    settings : Settings
+        The new settings.
+    """
+    global __current
+    if not isinstance(settings, Settings):
+        raise TypeError("settings must be a Settings, not " + type(settings).__name__)
+    __current = settings
+
+def load_settings(path):
+    """
+    Read the settings from a JSON file. The missing values are the defaults.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    settings : Settings
+        The settings.
+
+    Raises
+    ------
+    OSError
+        If the file can't be read.
+    ValueError
+        If the file is not valid JSON, or a value is bad.
+    """
+    with open(path) as f:
+        values = json.load(f)
+    if not isinstance(values, dict):
+        raise ValueError("The settings file must contain a JSON object.")
+    return Settings.from_dict(values)
+
+def save_settings(settings, path):
+    """
+    Write the settings in a JSON file.
+
+    The file is written next to the path, then renamed : a reader never sees half of the file.
+
+    Parameters
+    ----------
+    settings : Settings
+        The settings.
+    path : str
+        Path of the file.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(settings.to_dict(), f, indent=4)
+    os.replace(tmp, path)
+
+class SettingsFile:
+    """
+    Settings file reloaded when it changes.
+
+    refresh is called between two frames : if the file changed, it's read, checked, and replaces the current
+    settings. A bad file is reported and the current settings are kept.
+    """
+    def __init__(self, path, interval=1.0):
+        """
+        Load the file, and set its settings as the current settings.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file. If it doesn't exist, it's created with the current settings.
+        interval : float
+            Shortest time between two checks of the file, in seconds.
+
+        Raises
+        ------
+        OSError
+            If the file can't be read.
+        ValueError
+            If the file is not valid.
+        """
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        if not os.path.exists(path):
+            save_settings(get_settings(), path)
+        stat = os.stat(path)
+        self.__stamp = (stat.st_mtime_ns, stat.st_size)
+        self.__checked = time.monotonic()
+        set_settings(load_settings(path))
+
+    def refresh(self, force=False):
+        """
+        Reload the file if it changed.
+
+        Parameters
+        ----------
+        force : bool
+            True to check the file now, even if it was checked less than interval ago.
+
+        Returns
+        -------
+        reloaded : bool
+            True if new settings are applied.
+        """
+        now = time.monotonic()
+        if not force and now - self.__checked < self.interval:
+            return False
+        self.__checked = now
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self.__stamp:
+                return False
+            self.__stamp = stamp #a bad file is only read again when it changes
+            settings = load_settings(self.path)
+        except (OSError, ValueError) as e:
+            print(e)
+            self.errors += 1
+            self.last_error = str(e)
+            return False
+        set_settings(settings)
+        self.reloads += 1
+        self.last_error = None
+        return True
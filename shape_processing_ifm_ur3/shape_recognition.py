@@ -2,10 +2,20 @@ import cv2
 import sys
 import argparse
 import numpy as np
-from math import pi
-from Shape import Shape
-
-def shape_recognition(shape,path):
+from .Shape import Shape
+from .preprocessing import get_preprocessor
+from .features import ContourFeatures
+from .classification import classify
+from .pyramid import coarse_to_fine
+from .detection import Detection
+from .tracing import span
+from .settings import get_settings
+
+MAX_CANDIDATES = None
+PYRAMID_LEVELS = 0
+TILES = None
+
+def shape_recognition(shape,path,features=False,pyramid_levels=None,tiles=None):
     """
     Detects different types of shapes on an image.
 
@@ -17,8 +27,16 @@ def shape_recognition(shape,path):
     ----------
     shape : Shape
         The shape we want to detect
-    path : str
-        The path of the image.
+    path : str or numpy.ndarray
+        The path of the image. Or the grayscale image.
+    features : bool
+        If True, the geometry of the detected shape is returned too.
+    pyramid_levels : int
+        If more than 0, the shapes are found on a downsampled image, then only refined at full resolution.
+        None to use PYRAMID_LEVELS.
+    tiles : tuple of int
+        Number of rows and columns of tiles, preprocessed by a pool of threads. The result is the same.
+        None to use TILES.
 
     Returns
     -------
@@ -32,270 +50,190 @@ def shape_recognition(shape,path):
         Center of the detected shape.
     angle : float
         Angle of rotation of the detected shape.
+    last_features : ContourFeatures
+        Only if `features` is True. Geometry of the shape, to give to shape_size and ur3. Or None.
     """
-    img = __processing(path)
+    img, candidates, detected_list = detect_candidates(path, pyramid_levels, tiles)
     if shape is None:
         try:
             raise AttributeError('Shape cannot be None')
         except AttributeError as e:
             print(e)
             return None, img, None
-    shape = shape.value
-    height, width = img.shape
-    img = __fill_holes(height, width, img)
-
-    detected,last_cont, detected_shape, center, angle = __detect_shape(img, height, width, shape)
-    last_cont = __useless_contour(shape, detected, last_cont,center,angle)
-    return last_cont, img, detected_shape, center, angle
+    return select_shape(shape, img, candidates, detected_list).as_tuple(features)
 
-def __useless_contour(shape, detected, last_cont,center,angle):
+def detect(shape, path, pyramid_levels=None, tiles=None):
     """
-    Erase the useless contours, center, and angle.
+    Detects a shape on an image, without drawing anything.
 
-    Contours, center, and angle are erased if the shape type is ALL, PARTIAL or UNKNOWN.
+    Same as shape_recognition, but the result is a Detection.
+    The annotated image is only rendered if Detection.overlay is called.
 
     Parameters
     ----------
     shape : Shape
         The shape we want to detect
-    detected : Shape
-        The detected shape
-    last_cont : numpy.ndarray
-        Contours of the shape.
-    center : tuple of float
-        Center of the detected shape.
-    angle : float
-        Angle of rotation of the detected shape.
+    path : str or numpy.ndarray
+        The path of the image. Or the grayscale image.
+    pyramid_levels : int
+        If more than 0, the shapes are found on a downsampled image, then only refined at full resolution.
+        None to use PYRAMID_LEVELS.
+    tiles : tuple of int
+        Number of rows and columns of tiles, preprocessed by a pool of threads. The result is the same.
+        None to use TILES.
 
     Returns
     -------
-    last_cont : numpy.ndarray
-        Contours of the shape.
-    center : tuple of float
-        Center of the detected shape.
-    angle : float
-        Angle of rotation of the detected shape.
-    """
-    if shape == Shape.ALL.value or \
-            shape == Shape.PARTIAL.value or \
-                shape == Shape.UNKNOW.value:
-            last_cont = np.array([])
-            center = None
-            angle = None
-    return last_cont
-
-def __detect_shape(img, height, width, shape):
+    detection : Detection
+        The detected shapes. Its image is reused by the next call.
     """
-    The process to detect the shape.
-
-    It detects the number of shape's edges. If a shape has 3 edges, it's a triangle.
+    img, candidates, detected_list = detect_candidates(path, pyramid_levels, tiles)
+    return select_shape(shape, img, candidates, detected_list)
 
-    Parameters
-    ----------
-    img : numpy.ndarray
-        The image whose shapes we want to detect
-    height : int
-        Image's height
-    width : int
-        Image's width
-    shape : Shape
-        The shape we want to detect
-    Returns
-    -------
-    detected : Shape
-        The detected shape
-    last_cont : numpy.ndarray
-        Contours of the shape.
-    detected_shapes : list
-        The detected shapes.
-    center : tuple of float
-        Center of the detected shape.
-    angle : float
-        Angle of rotation of the detected shape.
+def detect_candidates(path, pyramid_levels=None, tiles=None):
     """
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    contours, _ = cv2.findContours(img,cv2.RETR_TREE,cv2.CHAIN_APPROX_SIMPLE)
-    hull_list = __convex_hull(contours)
-    minimal_area = 200 
-    maximal_area = (height*width)-2000
-    detected = None
-    detected_shapes = []
-    last_cont = np.array([]) 
-    center = None
-    angle = None
-    for cont in hull_list:
-        area = cv2.contourArea(cont)
-        #continue if area is too small(noise) or too big
-        if area < minimal_area or area >= maximal_area: 
-            continue
-        approx = __approx_poly(cont, img)    
-        detected = __check_partial(detected,approx,width,height)
-        if detected != Shape.PARTIAL.value:
-            detected = __check_non_partial_shape(cont, area, approx)
-        shape_name = Shape(detected).name
-        detected_shapes.append(shape_name)
-        if shape == Shape.ALL.value or detected == shape:
-            x = cont[0][0][0]   #x value of a point of the shape
-            y = cont[0][0][1]   #y value of a point of the shape
-            cv2.putText(img, shape_name,(x,y),font,0.5,(255))
-            if detected == shape:
-                last_cont = approx
-                center,_,angle = cv2.minAreaRect(cont)
-                break
-    return detected,last_cont, detected_shapes, center, angle
-
-def __check_non_partial_shape(cont, area, approx):
-    """
-    Detects the non partial shapes.
+    Find and classify all the shapes of an image.
 
-    It detects it with the number of edges.
+    This part does not depend on the shape we want, so its result can be reused for another shape.
 
     Parameters
     ----------
-    cont : numpy.ndarray
-        Contours of the current shape.
-    area : float
-        area of the current shape.
-    approx : numpy.ndarray
-        Approximates a polygonal curves.
+    path : str or numpy.ndarray
+        The path of the image. Or the grayscale image.
+    pyramid_levels : int
+        If more than 0, the shapes are found on a downsampled image, then only refined at full resolution.
+        None to use PYRAMID_LEVELS.
+    tiles : tuple of int
+        Number of rows and columns of tiles, preprocessed by a pool of threads. The result is the same.
+        None to use TILES.
 
     Returns
     -------
-    detected : Shape
-        The detected shape
+    img : numpy.ndarray
+        The image whose shapes we want to detect, without holes. Its buffer is reused by the next call.
+    candidates : list of ContourFeatures
+        Geometry of the shapes.
+    detected_list : numpy.ndarray
+        The detected shape (Shape value) of each candidate.
     """
-    _,radius = cv2.minEnclosingCircle(cont) #put a circle on the shape to get a radius
-    radius = radius-1
-    #calcul the area of the circle added over the shape to detect if it's a circle
-    if ((pi*(radius**2)) <= area) : 
-        detected = Shape.CIRCLE.value 
-    elif len(approx) == 3:
-        detected = Shape.TRIANGLE.value
-    elif len(approx) == 4:
-        detected = __check_square_or_rectangle(cont)
-    elif ((len(approx) >= 5)):
-        detected = __check_more_5_edge_shape(cont, area, approx)
-    else:
-        detected = Shape.UNKNOW.value
-    return detected
-
-def __check_more_5_edge_shape(cont, area, approx):
+    if pyramid_levels is None:
+        pyramid_levels = PYRAMID_LEVELS
+    if tiles is None:
+        tiles = TILES
+    contours = None
+    with span("preprocessing", tiles=tiles, pyramid_levels=pyramid_levels):
+        if pyramid_levels > 0:
+            img, contours = coarse_to_fine(__read(path), pyramid_levels, get_settings().minimal_area)
+        else:
+            img = __processing(path, tiles)
+    height, width = img.shape
+    if contours is None:
+        with span("fill_holes"):
+            img = __fill_holes(height, width, img)
+    with span("contours"):
+        candidates = __find_candidates(img, height, width, contours)
+    with span("classification", candidates=len(candidates)):
+        return img, candidates, classify(candidates, width, height)
+
+def select_shape(shape, img, candidates, detected_list):
     """
-    Detects shape with more than 5 edges.
+    Keep the first shape of the wanted type.
 
     Parameters
     ----------
-    cont : numpy.ndarray
-        Contours of the current shape.
-    area : float
-        area of the current shape.
-    approx : numpy.ndarray
-        Approximates a polygonal curves.
+    shape : Shape
+        The shape we want to detect
+    img : numpy.ndarray
+        The image given by detect_candidates.
+    candidates : list of ContourFeatures
+        Geometry of the shapes, given by detect_candidates.
+    detected_list : numpy.ndarray
+        The detected shapes, given by detect_candidates.
 
     Returns
     -------
-    detected : Shape
-        The detected shape
-    """
-    _,(a,b),_ = cv2.fitEllipse(cont) #Add an ellipse on the shape
-    a/=2
-    b/=2
-    #calcul the area of the ellipse added over the shape to detect if it's a ellipse
-    if((pi*a*b)-100 <= area):
-        detected = Shape.ELLIPSE.value
-    elif len(approx) == 5:
-        detected = Shape.PENTAGON.value
-    elif len(approx) == 6:
-        detected = Shape.HEXAGON.value
-    elif len(approx) == 7:
-        detected = Shape.HEPTAGON.value
-    elif len(approx) == 8:
-        detected = Shape.OCTAGON.value
-    return detected
-
-def __check_square_or_rectangle(cont):
+    detection : Detection
+        The detected shapes.
     """
-    Detects if the shape is a square or a rectangle. 
-    
-    If the ratio between the width and the height is almost 1, it's a square.
-
-    Parameters
-    ----------
-    cont : numpy.ndarray
-        Contours of the current shape.
+    return Detection(shape, img, candidates, detected_list)
 
-    Returns
-    -------
-    detected : Shape
-        The detected shape
+def __find_candidates(img, height, width, contours=None):
     """
-    _, (w,h), _ = cv2.minAreaRect(cont) #Add a rectangle on the shape
-    aspectRatio = float(w)/h
-    if aspectRatio >= 0.9 and aspectRatio <= 1.1:  #It's a square if the ratio height, width is +- 1
-        detected = Shape.SQUARE.value
-    else:
-        detected = Shape.RECTANGLE.value
-    return detected
-    
-def __check_partial(detected,approx, width, height):
-    """
-    Check if it's a partial shape
+    Find the contours that can be a shape.
 
-    It's a partial shape if the shape's contours is on the image's edges.
+    The contours too small (noise) or too big are rejected.
 
     Parameters
     ----------
-    detected : Shape
-        The detected shape
-    approx : numpy.ndarray
-        Approximates a polygonal curves.
-    width : int
-        Image's width
+    img : numpy.ndarray
+        The image whose shapes we want to detect
     height : int
         Image's height
-    
+    width : int
+        Image's width
+    contours : list
+        Contours of the shapes, if they are already found. None to find them on the image.
+
     Returns
     -------
-    detected : Shape
-        The detected shape
+    candidates : list of ContourFeatures
+        Geometry of the convex hull of the shapes.
     """
-    # Checks in the x,y positions of the contours. 
-    # The shape is on the image's edges if a point is less than 1 or more than width-1.
-    result = np.where((approx <= 1) | (approx >= width-1))
-    if(len(result[0]) > 0): #result[0] contain the positions found by np.where.
-        detected = Shape.PARTIAL.value
-    else:
-        #check if there is a point(X or Y) equals to height or height-1.
-        result = np.where((approx == height) | (approx == height-1)) 
-        result = np.where(result[2] == 1) #check if this point is Y.
-        if(len(result[0])>0):
-            detected = Shape.PARTIAL.value
-        else:
-            detected = None
-    return detected
+    if contours is None:
+        contours, _ = cv2.findContours(img,cv2.RETR_TREE,cv2.CHAIN_APPROX_SIMPLE) #if the seeds of fill-holes are blocked, the shapes are holes of the background
+    settings = get_settings()
+    minimal_area = settings.minimal_area
+    maximal_area = (height*width)-settings.maximal_area_margin
+    contours = __prune_contours(contours, minimal_area, maximal_area, MAX_CANDIDATES)
+    hull_list = __convex_hull(contours)
+    candidates = []
+    for cont in hull_list:
+        features = ContourFeatures(cont)
+        #continue if area is too small(noise) or too big
+        if features.area < minimal_area or features.area >= maximal_area: 
+            continue
+        candidates.append(features)
+    return candidates
 
-def __approx_poly(cont, img):
+def __prune_contours(contours, minimal_area, maximal_area, max_candidates=None):
     """
-    Approximates a polygonal curve(s) with a specified precision.
+    Reject the contours that cannot be a shape, before computing their hull.
 
-    With approxPolyDP we get only one position per side.
+    The hull is inside the bounding box and contains the contour.
+    So the hull area is too small if the bounding box area is too small,
+    and too big if the contour area is already too big.
 
     Parameters
     ----------
-    cont : numpy.ndarray
-        Contours of the current shape.
-    img : numpy.ndarray
-        The image whose shapes we want to detect
+    contours : list
+        Contours of all shapes
+    minimal_area : float
+        Smallest area of a shape. Smaller is noise.
+    maximal_area : float
+        Area from which a shape is too big.
+    max_candidates : int
+        Maximal number of contours to keep. The biggest are kept, in the same order. None to keep all.
 
     Returns
     -------
-    approx
-        Approximates a polygonal curves.
+    pruned : list
+        The contours that can be a shape.
     """
-    cnt_len = cv2.arcLength(cont,True)
-    approx = cv2.approxPolyDP(cont,0.04*cnt_len,True) #0.04 is the precision
-    cv2.drawContours(img,[approx],0,(255),3)    
-    return approx
+    pruned = []
+    box_areas = []
+    for cont in contours:
+        _, _, w, h = cv2.boundingRect(cont)
+        box_area = w*h
+        if box_area < minimal_area:
+            continue
+        if box_area >= maximal_area and cv2.contourArea(cont) >= maximal_area:
+            continue
+        pruned.append(cont)
+        box_areas.append(box_area)
+    if max_candidates is not None and len(pruned) > max_candidates:
+        kept = np.sort(np.argsort(box_areas, kind="stable")[::-1][:max_candidates])
+        pruned = [pruned[i] for i in kept]
+    return pruned
 
 def __convex_hull(contours):
     """
@@ -342,40 +280,55 @@ def __fill_holes(height, width, img):
     img : numpy.ndarray
         The image without holes.
     """
-    src = img.copy()
-    mask = np.zeros((height+2, width+2), np.uint8)
-    cv2.floodFill(img, mask, (0,0), 255)
-    cv2.floodFill(img, mask, (int(width/2),10), 255) #The outside of the shapes will be white
-    img = cv2.bitwise_not(img)
-    img = (src | img) #merge the 2 images
-    return img
+    return get_preprocessor(height, width).fill_holes(img)
 
-def __processing(path):
+def __processing(path, tiles=None):
     """
     Process the image.
 
-    Blur and detect the edges of the image.
+    Blur and detect the edges of the image.\n
+    The edges are shown when the image is read from a file.
 
     Parameters
     ----------
-    path : str
-        Image's path
+    path : str or numpy.ndarray
+        Image's path. Or the grayscale image.
+    tiles : tuple of int
+        Number of rows and columns of tiles. None to process the whole image at once.
 
     Returns
     -------
     img : numpy.ndarray
         The image whose shapes we want to detect
     """
-    kernel = np.ones((3,3),np.uint8)
-    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-    img = cv2.GaussianBlur(img,(5,5),1)
-    img = cv2.Canny(img,150, 190)
-    cv2.imshow("Shape Detection",img)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
-    img = cv2.morphologyEx(img, cv2.MORPH_CLOSE, kernel,iterations=3)
+    img = __read(path)
+    height, width = img.shape
+    preprocessor = get_preprocessor(height, width, tiles)
+    img = preprocessor.process(img)
+    if isinstance(path, str):
+        cv2.imshow("Shape Detection",preprocessor.edges)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
     return img
 
+def __read(path):
+    """
+    Read the image.
+
+    Parameters
+    ----------
+    path : str or numpy.ndarray
+        Image's path. Or the grayscale image.
+
+    Returns
+    -------
+    img : numpy.ndarray
+        The grayscale image.
+    """
+    if isinstance(path, str):
+        return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    return path
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("-i", "--image", help = "path to the image file",required=True)
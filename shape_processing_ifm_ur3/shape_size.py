@@ -1,8 +1,10 @@
 import cv2
 import numpy as np
-from shape_recognition import shape_recognition
-from Shape import Shape
-from Camera import Camera
+from .shape_recognition import shape_recognition
+from .Shape import Shape
+from .features import ContourFeatures
+from .tracing import span
+from .settings import get_settings
 import math
 
 def shape_size(contour,dist):
@@ -13,8 +15,8 @@ def shape_size(contour,dist):
 
     Parameters
     ----------
-    contour : numpy.ndarray
-        The object's contours.
+    contour : numpy.ndarray or ContourFeatures
+        The object's contours. Or its geometry, given by shape_recognition.
     dist : numpy.ndarray
         The distance image
     
@@ -27,18 +29,24 @@ def shape_size(contour,dist):
     width: float
         The object width in meters
     """
+    features = contour
+    if isinstance(features, ContourFeatures):
+        contour = features.approx
+    else:
+        features = ContourFeatures(contour)
     try:  
         if(contour.size == 0):
             raise ValueError('Contours can not be empty. I can not calculate the object size.')
     except Exception as e:
         print(e)
         return None, None, None
-    height = __get_height(contour,dist)
-    length, width = __get_length_width(contour,dist)
+    with span("sizing"):
+        height = __get_height(contour,features,dist)
+        length, width = __get_length_width(features,dist)
     return  height, length, width
 
 
-def __get_length_width(contour, dist):
+def __get_length_width(features, dist):
     """
     Get the shape length and width.
 
@@ -46,8 +54,8 @@ def __get_length_width(contour, dist):
 
     Parameters
     ----------
-    contour : numpy.ndarray
-        The object's contours.
+    features : ContourFeatures
+        The object's geometry.
     dist : numpy.ndarray
         The distance image
     
@@ -58,7 +66,7 @@ def __get_length_width(contour, dist):
     obj_width: float
         The object width in meters
     """
-    _, (width, length), angle = cv2.minAreaRect(contour)
+    _, (width, length), angle = features.min_area_rect
     if(width > length):
         tmp = length
         length = width
@@ -67,7 +75,7 @@ def __get_length_width(contour, dist):
     _, x2 = dist.shape
     a = dist[0,0]
     b = dist[0,x2-1]
-    angle = 40 
+    angle = get_settings().field_of_view
     c = math.sqrt(a**2 + b**2 - 2*a*b*math.cos(math.radians(angle))) # Al-Kashi
 
     pixel_size = c/x2
@@ -75,7 +83,7 @@ def __get_length_width(contour, dist):
     obj_width = width*pixel_size
     return obj_length, obj_width
 
-def __get_height(contour,dist):
+def __get_height(contour,features,dist):
     """
     Get the shape height.
 
@@ -85,6 +93,8 @@ def __get_height(contour,dist):
     ----------
     contour : numpy.ndarray
         The object's contours.
+    features : ContourFeatures
+        The object's geometry.
     dist : numpy.ndarray
         The distance image
     
@@ -94,11 +104,11 @@ def __get_height(contour,dist):
         The object height in meters
     """
     object_mask, object_dist = __object_distance(contour, dist) 
-    floor_dist = __floor_distance(contour, dist, object_mask)
+    floor_dist = __floor_distance(features, dist, object_mask)
     height = floor_dist-object_dist   
     return height
 
-def __floor_distance(contour, dist, mask):
+def __floor_distance(features, dist, mask):
     """
     Detect the distance between the floor and the Camera.
 
@@ -106,8 +116,8 @@ def __floor_distance(contour, dist, mask):
 
     Parameters
     ----------
-    contour : numpy.ndarray
-        The object's contours.
+    features : ContourFeatures
+        The object's geometry.
     dist : numpy.ndarray
         The distance image
     mask : numpy.ndarray
@@ -119,9 +129,9 @@ def __floor_distance(contour, dist, mask):
         The mean distance of the floor.
     """
     mask_out = np.zeros(dist.shape,np.uint8)
-    cont_out = cv2.minAreaRect(contour)
+    cont_out = features.min_area_rect
     cont_out = cv2.boxPoints(cont_out)
-    cont_out = np.int0(cont_out)
+    cont_out = cont_out.astype(np.intp)
     cv2.drawContours(mask_out, [cont_out], -1, (255), -1)
     mask_out = cv2.dilate(mask_out,(5,5),iterations=10)
     mask = cv2.dilate(mask,(3,3),iterations=2)
@@ -157,6 +167,7 @@ def __object_distance(contour, dist):
     return mask, mean_dist
 
 def main():
+    from .Camera import Camera #ifm3dpy is only needed with the camera
     cam = Camera()
     try:
         im = cam.get_image()
@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from .Shape import Shape
+from .shape_recognition import detect
+from .shape_size import shape_size
+from .preprocessing import to_gray
+from .benchmark import SyntheticCamera
+
+STAGES = ["recognition", "sizing"]
+
+MAX_RSS_GROWTH = 16*2**20 #bytes, after the warm-up
+MAX_TRACED_GROWTH = 2*2**20 #bytes, after the warm-up
+MAX_FRAME_BYTES = 2*2**20 #bytes alive at once in a stage, for one frame
+MAX_FRAME_BLOCKS = 400 #allocations alive at once in a stage, for one frame
+
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+
+def soak(frames=100000, camera=None, shape=Shape.RECTANGLE, warm_up=200, sample_every=1000,
+         max_rss_growth=MAX_RSS_GROWTH, max_traced_growth=MAX_TRACED_GROWTH,
+         max_frame_bytes=MAX_FRAME_BYTES, max_frame_blocks=MAX_FRAME_BLOCKS):
+    """
+    Run the detection and the sizing on a long stream of frames, and check the memory.
+
+    The memory is checked in two ways :\n
+    growth : the RSS and the memory traced by tracemalloc must not grow after the warm-up.\n
+    per frame : every sample_every frames, the allocations of each stage are followed. At each return of a function
+    of the package, the new allocations still alive are counted by site. The largest total must stay under the budget.
+
+    Parameters
+    ----------
+    frames : int
+        Number of frames after the warm-up.
+    camera : Camera
+        The frame stream. None for a SyntheticCamera.
+    shape : Shape
+        Shape to detect.
+    warm_up : int
+        Number of frames before the reference measure. The buffers and the caches are allocated during the warm-up.
+    sample_every : int
+        Number of frames between two samples of the RSS and of the allocations.
+    max_rss_growth : int
+        Maximal growth of the RSS, in bytes.
+    max_traced_growth : int
+        Maximal growth of the memory traced by tracemalloc, in bytes.
+    max_frame_bytes : int
+        Maximal size of the allocations alive at once in a stage, in bytes.
+    max_frame_blocks : int
+        Maximal number of allocations alive at once in a stage.
+
+    Returns
+    -------
+    result : dict
+        Growths, RSS samples, budgets per stage with their top allocation sites, leak sites, and the failures.
+        ok is True if there's no failure.
+    """
+    if camera is None:
+        camera = SyntheticCamera()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        for _ in range(warm_up):
+            __frame(camera, shape)
+        reference = tracemalloc.take_snapshot()
+        traced_start = tracemalloc.get_traced_memory()[0]
+        rss = [(0, __rss())]
+        stages = {name: {"bytes": 0, "blocks": 0, "sites": {}} for name in STAGES}
+        start = time.perf_counter()
+        for i in range(1, frames+1):
+            if i % sample_every:
+                __frame(camera, shape)
+                continue
+            __sampled_frame(camera, shape, stages)
+            rss.append((i, __rss()))
+        elapsed = time.perf_counter() - start
+        traced_growth = tracemalloc.get_traced_memory()[0] - traced_start
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        leaks = [stat for stat in tracemalloc.take_snapshot().filter_traces(filters).compare_to(reference, "lineno")
+                 if stat.size_diff > 0]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    rss_values = np.array([value for _, value in rss], np.float64)
+    window = max(len(rss_values)//10, 1)
+    rss_growth = float(np.median(rss_values[-window:]) - np.median(rss_values[:window]))
+    failures = []
+    if rss_growth > max_rss_growth:
+        failures.append("RSS grew by " + str(int(rss_growth)) + " bytes.")
+    if traced_growth > max_traced_growth:
+        failures.append("Traced memory grew by " + str(traced_growth) + " bytes.")
+    for name, stage in stages.items():
+        if stage["bytes"] > max_frame_bytes:
+            failures.append(name + " keeps " + str(stage["bytes"]) + " bytes alive for one frame.")
+        if stage["blocks"] > max_frame_blocks:
+            failures.append(name + " keeps " + str(stage["blocks"]) + " allocations alive for one frame.")
+        stage["sites"] = sorted(stage["sites"].items(), key=lambda site: site[1][0], reverse=True)
+    return {"ok": not failures, "failures": failures, "frames": frames, "elapsed": elapsed,
+            "rss_growth": rss_growth, "traced_growth": traced_growth, "rss": rss,
+            "stages": stages, "leaks": [(str(stat.traceback[0]), stat.size_diff, stat.count_diff) for stat in leaks]}
+
+def __frame(camera, shape):
+    """
+    Process one frame.
+
+    Parameters
+    ----------
+    camera : Camera
+        The frame stream.
+    shape : Shape
+        Shape to detect.
+    """
+    im = camera.get_image()
+    detection = detect(shape, to_gray(im.amplitude_image()))
+    if detection.index is not None:
+        features = detection.features
+        shape_size(features if features is not None else detection.contour, im.distance_image())
+
+def __sampled_frame(camera, shape, stages):
+    """
+    Process one frame, and follow the allocations of each stage.
+
+    Parameters
+    ----------
+    camera : Camera
+        The frame stream.
+    shape : Shape
+        Shape to detect.
+    stages : dict
+        Largest size and number of allocations, and sites, of each stage. Updated.
+    """
+    im = camera.get_image()
+    detection = __follow(stages["recognition"], lambda: detect(shape, to_gray(im.amplitude_image())))
+    if detection.index is not None:
+        features = detection.features
+        contour = features if features is not None else detection.contour
+        __follow(stages["sizing"], lambda: shape_size(contour, im.distance_image()))
+
+def __follow(stage, run):
+    """
+    Run a stage, and take a snapshot at each return of a function of the package.
+
+    At a return, the locals of the function are still alive : the temporary arrays are counted.
+
+    Parameters
+    ----------
+    stage : dict
+        Largest size and number of allocations, and sites, of the stage. Updated.
+    run : function
+        The stage.
+
+    Returns
+    -------
+    result
+        Result of the stage.
+    """
+    before = tracemalloc.take_snapshot()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    def profile(frame, event, arg):
+        if event != "return" or not frame.f_code.co_filename.startswith(PACKAGE) \
+                or frame.f_code.co_filename == __file__:
+            return
+        stats = [stat for stat in tracemalloc.take_snapshot().filter_traces(filters).compare_to(before, "lineno")
+                 if stat.size_diff > 0]
+        stage["bytes"] = max(stage["bytes"], sum(stat.size_diff for stat in stats))
+        stage["blocks"] = max(stage["blocks"], sum(stat.count_diff for stat in stats if stat.count_diff > 0))
+        for stat in stats:
+            site = str(stat.traceback[0])
+            size, count = stage["sites"].get(site, (0, 0))
+            stage["sites"][site] = (max(size, stat.size_diff), max(count, stat.count_diff))
+    sys.setprofile(profile)
+    try:
+        return run()
+    finally:
+        sys.setprofile(None)
+
+def __rss():
+    """
+    Get the resident memory of the process.
+
+    Returns
+    -------
+    rss : int
+        Resident memory, in bytes. The peak if the current one is unknown.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Soak test : memory growth and allocations per frame of the detection and the sizing.")
+    parser.add_argument("-n", "--frames", type=int, default=100000, help="Number of frames.")
+    parser.add_argument("--replay", default=None, help="Recording to replay (ring file or .npz export) instead of synthetic scenes.")
+    parser.add_argument("--shape", default=Shape.RECTANGLE.name, choices=list(Shape.__members__), help="Shape to detect.")
+    parser.add_argument("--sample-every", type=int, default=1000, help="Number of frames between two samples.")
+    parser.add_argument("--max-rss-growth", type=int, default=MAX_RSS_GROWTH, help="Maximal RSS growth, in bytes.")
+    parser.add_argument("--max-traced-growth", type=int, default=MAX_TRACED_GROWTH, help="Maximal traced memory growth, in bytes.")
+    parser.add_argument("--max-frame-bytes", type=int, default=MAX_FRAME_BYTES, help="Maximal bytes alive at once in a stage.")
+    parser.add_argument("--max-frame-blocks", type=int, default=MAX_FRAME_BLOCKS, help="Maximal allocations alive at once in a stage.")
+    parser.add_argument("--top", type=int, default=5, help="Number of allocation sites shown per stage.")
+    args = parser.parse_args()
+
+    result = soak(args.frames, SyntheticCamera(args.replay), Shape[args.shape], sample_every=args.sample_every,
+                  max_rss_growth=args.max_rss_growth, max_traced_growth=args.max_traced_growth,
+                  max_frame_bytes=args.max_frame_bytes, max_frame_blocks=args.max_frame_blocks)
+    print("Frames : ", result["frames"], " in ", round(result["elapsed"], 1), "s")
+    print("RSS growth : ", int(result["rss_growth"]), "bytes")
+    print("Traced growth : ", result["traced_growth"], "bytes")
+    for name, stage in result["stages"].items():
+        print(name, ": ", stage["bytes"], "bytes, ", stage["blocks"], "allocations alive at once")
+        for site, (size, count) in stage["sites"][:args.top]:
+            print("    ", site, size, "bytes", count, "allocations")
+    if result["leaks"]:
+        print("Growing sites :")
+        for site, size, count in result["leaks"][:args.top]:
+            print("    ", site, "+" + str(size), "bytes", "+" + str(count), "allocations")
+    for failure in result["failures"]:
+        print(failure)
+    sys.exit(0 if result["ok"] else 1)
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from collections import deque
+
+CAPACITY = 100000 #spans kept in memory, the oldest are dropped
+
+class Tracer:
+    """
+    Record the spans of each frame : name, start, duration, thread and frame ID.
+
+    The spans are kept in a bounded buffer, and exported on demand to the Chrome trace-event format
+    (chrome://tracing or https://ui.perfetto.dev). The spans of a thread nest by time.\n
+    Disabled, a span costs one test.
+    """
+    def __init__(self, capacity=CAPACITY, enabled=False):
+        """
+        Create the tracer.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of spans kept.
+        enabled : bool
+            True to record the spans.
+        """
+        self.enabled = enabled
+        self.frames = 0
+        self.__spans = deque(maxlen=capacity)
+        self.__threads = {}
+        self.__local = threading.local()
+        self.__origin = time.perf_counter()
+        self.__null = contextlib.nullcontext()
+
+    @property
+    def capacity(self):
+        """
+        int : Number of spans kept.
+        """
+        return self.__spans.maxlen
+
+    @property
+    def current_frame(self):
+        """
+        int : ID of the frame processed by this thread. None outside a frame.
+        """
+        return getattr(self.__local, "frame", None)
+
+    def span(self, name, frame=None, **args):
+        """
+        Record a step.
+
+        e.g with tracer.span("sizing"):
+
+        Parameters
+        ----------
+        name : str
+            Name of the step.
+        frame : int
+            ID of the frame. None for the frame of this thread : give it to the spans of a pool of threads.
+        **args
+            Shown with the span.
+
+        Returns
+        -------
+        span : context manager
+            The step is the block.
+        """
+        if not self.enabled:
+            return self.__null
+        return self.__record(name, self.current_frame if frame is None else frame, args)
+
+    def frame(self, frame_id=None, **args):
+        """
+        Record a frame. The spans of this thread in the block belong to it.
+
+        Parameters
+        ----------
+        frame_id : int
+            ID of the frame. None for the next number.
+        **args
+            Shown with the span.
+
+        Returns
+        -------
+        span : context manager
+            The frame is the block.
+        """
+        if not self.enabled:
+            return self.__null
+        if frame_id is None:
+            frame_id = self.frames
+        self.frames = max(self.frames, frame_id+1)
+        return self.__frame(frame_id, args)
+
+    def clear(self):
+        """
+        Forget the spans.
+        """
+        self.__spans.clear()
+
+    def export(self, path=None):
+        """
+        Get the spans in the Chrome trace-event format.
+
+        Parameters
+        ----------
+        path : str
+            Path of the JSON file to write. None to only return the trace.
+
+        Returns
+        -------
+        trace : dict
+            The trace. Its traceEvents are the complete events (ph X), times in microseconds,
+            and the names of the threads.
+        """
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in list(self.__threads.items())]
+        for name, start, end, tid, frame, args, error in list(self.__spans):
+            event = {"name": name, "cat": "pick", "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round((start-self.__origin)*1e6, 3), "dur": round((end-start)*1e6, 3),
+                     "args": dict(args, frame=frame)}
+            if error is not None:
+                event["args"]["error"] = error
+            events.append(event)
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+    @contextlib.contextmanager
+    def __frame(self, frame_id, args):
+        """
+        Record a frame, and set it as the frame of this thread.
+
+        Parameters
+        ----------
+        frame_id : int
+            ID of the frame.
+        args : dict
+            Shown with the span.
+        """
+        previous = self.current_frame
+        self.__local.frame = frame_id
+        try:
+            with self.__record("frame", frame_id, args):
+                yield
+        finally:
+            self.__local.frame = previous
+
+    @contextlib.contextmanager
+    def __record(self, name, frame, args):
+        """
+        Record a span.
+
+        If the block raises an exception, its type is shown with the span.
+
+        Parameters
+        ----------
+        name : str
+            Name of the step.
+        frame : int
+            ID of the frame.
+        args : dict
+            Shown with the span.
+        """
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self.__threads:
+            self.__threads[tid] = thread.name
+        error = None
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.__spans.append((name, start, time.perf_counter(), tid, frame, args, error))
+
+TRACER = Tracer()
+
+def span(name, frame=None, **args):
+    """
+    Record a step with the default tracer. See Tracer.span.
+    """
+    return TRACER.span(name, frame, **args)
+
+def frame(frame_id=None, **args):
+    """
+    Record a frame with the default tracer. See Tracer.frame.
+    """
+    return TRACER.frame(frame_id, **args)
+
+def current_frame():
+    """
+    Get the frame processed by this thread, with the default tracer.
+
+    Returns
+    -------
+    frame : int
+        ID of the frame. None outside a frame.
+    """
+    return TRACER.current_frame
+
+def enable(capacity=None):
+    """
+    Start recording with the default tracer.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of spans kept. None to keep the current capacity.
+    """
+    global TRACER
+    if capacity is not None and capacity != TRACER.capacity:
+        TRACER = Tracer(capacity)
+    TRACER.enabled = True
+
+def disable():
+    """
+    Stop recording with the default tracer. The spans are kept.
+    """
+    TRACER.enabled = False
+
+def export(path=None):
+    """
+    Export the spans of the default tracer. See Tracer.export.
+    """
+    return TRACER.export(path)
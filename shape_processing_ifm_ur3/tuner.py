@@ -0,0 +1,391 @@
+import os
+import sys
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor
+from .Shape import Shape
+from .shape_recognition import detect_candidates
+from .preprocessing import to_gray
+from .settings import get_settings, set_settings, save_settings
+
+# Values tried for each parameter. The other parameters keep the current settings.
+SEARCH_SPACE = {
+    "canny_low": [50, 80, 100, 120, 150, 180],
+    "canny_high": [120, 150, 190, 220, 250],
+    "close_iterations": [1, 2, 3, 4, 5],
+    "approx_epsilon": [0.02, 0.03, 0.04, 0.05, 0.06],
+    "minimal_area": [100.0, 200.0, 400.0, 800.0],
+    "maximal_area_margin": [1000.0, 2000.0, 4000.0],
+    "circle_margin": [0.0, 1.0, 2.0, 3.0],
+    "ellipse_margin": [50.0, 100.0, 150.0, 200.0],
+}
+TOLERANCE = 10.0 #pixels, largest distance between a labelled center and the detected one
+IGNORED = (Shape.PARTIAL, Shape.UNKNOW) #not counted as detections
+
+__frames = [] #labelled frames of the worker process
+__tolerance = TOLERANCE
+
+def load_dataset(path):
+    """
+    Load a labelled set of frames.
+
+    The file is a JSON object : {"frames": [...]}. Each frame is a recorded image and its labelled shapes,
+    e.g {"image": "frame0.png", "shapes": [{"shape": "CIRCLE", "center": [120, 80]}]}.\n
+    The image is a png file, or a frame of a recording : {"recording": "ring.bin", "frame": 3}.
+    The paths are relative to the file. Without center, a shape matches any detection of the same type.
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    frames : list
+        The grayscale image and the labelled shapes [(Shape, center)] of each frame.
+
+    Raises
+    ------
+    OSError
+        If a file can't be read.
+    ValueError
+        If a frame or a shape is not valid.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    folder = os.path.dirname(os.path.abspath(path))
+    recordings = {}
+    frames = []
+    for entry in manifest["frames"]:
+        if "image" in entry:
+            img = cv2.imread(os.path.join(folder, entry["image"]), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                raise OSError("Can't read the image : " + entry["image"])
+        elif "recording" in entry:
+            recording = os.path.join(folder, entry["recording"])
+            if recording not in recordings:
+                recordings[recording] = __read_recording(recording)
+            img = to_gray(recordings[recording][int(entry.get("frame", 0))])
+        else:
+            raise ValueError("A frame needs an image or a recording : " + json.dumps(entry))
+        shapes = []
+        for label in entry.get("shapes", []):
+            if label["shape"] not in Shape.__members__:
+                raise ValueError("Unknown shape : " + label["shape"])
+            center = label.get("center")
+            shapes.append((Shape[label["shape"]], None if center is None else (float(center[0]), float(center[1]))))
+        frames.append((img, shapes))
+    return frames
+
+def label_images(images, path):
+    """
+    Write a labelled set from the current detection, to correct by hand.
+
+    Parameters
+    ----------
+    images : list of str
+        Paths of the png images.
+    path : str
+        Path of the JSON file.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    frames = []
+    for image in images:
+        img = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise OSError("Can't read the image : " + image)
+        shapes = [{"shape": shape.name, "center": [round(float(c), 1) for c in center]}
+                  for shape, center in __detections(img)]
+        frames.append({"image": os.path.relpath(os.path.abspath(image), folder), "shapes": shapes})
+    with open(path, "w") as f:
+        json.dump({"frames": frames}, f, indent=4)
+
+def sample(count, space=None, base=None, seed=0):
+    """
+    Draw parameter sets in the search space. The first one is the base.
+
+    Parameters
+    ----------
+    count : int
+        Number of parameter sets.
+    space : dict
+        Values tried for each parameter. None for SEARCH_SPACE.
+    base : Settings
+        Settings of the parameters not in the space. None for the current settings.
+    seed : int
+        Seed of the draw.
+
+    Returns
+    -------
+    candidates : list of Settings
+        Different parameter sets. Less than count if the space is smaller.
+    """
+    space = SEARCH_SPACE if space is None else space
+    base = get_settings() if base is None else base
+    rng = np.random.default_rng(seed)
+    names = sorted(space)
+    size = int(np.prod([len(space[name]) for name in names]))
+    candidates = [base]
+    seen = set([tuple(getattr(base, name) for name in names)])
+    attempts = 0
+    while len(candidates) < count and len(seen) < size and attempts < 100*count:
+        attempts += 1
+        values = tuple(space[name][rng.integers(len(space[name]))] for name in names)
+        if values in seen:
+            continue
+        seen.add(values)
+        try:
+            candidates.append(replace(base, **dict(zip(names, values))))
+        except ValueError:
+            continue #e.g canny_low > canny_high
+    return candidates
+
+def tune(frames, candidates, workers=None, repeats=3, tolerance=TOLERANCE):
+    """
+    Evaluate parameter sets on the labelled frames, in a pool of processes.
+
+    Each process gets the frames once. The latency is measured in the process : use at most one process per core.
+
+    Parameters
+    ----------
+    frames : list
+        The labelled frames, given by load_dataset.
+    candidates : list of Settings
+        The parameter sets, e.g given by sample.
+    workers : int
+        Number of processes. None for the number of CPU.
+    repeats : int
+        Number of times each frame is processed. The fastest time is kept.
+    tolerance : float
+        Largest distance between a labelled center and the detected one, in pixels.
+
+    Returns
+    -------
+    results : list of dict
+        For each parameter set : the settings, accuracy (F1 score of the detections), precision, recall,
+        mean_ms and p95_ms (latency per frame).
+    """
+    with ProcessPoolExecutor(workers or os.cpu_count(), initializer=__start_worker,
+                             initargs=(frames, tolerance)) as pool:
+        results = list(pool.map(__evaluate, candidates, [repeats]*len(candidates)))
+    for settings, result in zip(candidates, results):
+        result["settings"] = settings
+    return results
+
+def pareto_front(results):
+    """
+    Keep the parameter sets that no other set beats on both accuracy and latency.
+
+    Parameters
+    ----------
+    results : list of dict
+        The results of tune.
+
+    Returns
+    -------
+    front : list of dict
+        The results on the front, from the fastest to the most accurate.
+    """
+    front = []
+    for result in sorted(results, key=lambda r: (r["mean_ms"], -r["accuracy"])):
+        if not front or result["accuracy"] > front[-1]["accuracy"]:
+            front.append(result)
+    return front
+
+def fastest(front, target):
+    """
+    Get the fastest parameter set that meets the accuracy target.
+
+    Parameters
+    ----------
+    front : list of dict
+        The Pareto front.
+    target : float
+        Smallest accuracy, between 0 and 1.
+
+    Returns
+    -------
+    result : dict
+        The result. None if no parameter set meets the target.
+    """
+    for result in front:
+        if result["accuracy"] >= target:
+            return result
+    return None
+
+def __start_worker(frames, tolerance):
+    """
+    Keep the labelled frames in the worker process.
+
+    Parameters
+    ----------
+    frames : list
+        The labelled frames.
+    tolerance : float
+        Largest distance between a labelled center and the detected one, in pixels.
+    """
+    global __frames, __tolerance
+    __frames = frames
+    __tolerance = tolerance
+
+def __evaluate(settings, repeats):
+    """
+    Evaluate a parameter set on the frames of the worker.
+
+    Parameters
+    ----------
+    settings : Settings
+        The parameter set.
+    repeats : int
+        Number of times each frame is processed.
+
+    Returns
+    -------
+    result : dict
+        accuracy, precision, recall, mean_ms and p95_ms.
+    """
+    set_settings(settings)
+    __detections(__frames[0][0]) #allocates the buffers
+    times = []
+    matched = detected = labelled = 0
+    for img, shapes in __frames:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            found = __detections(img)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+        matched += __match(found, shapes, __tolerance)
+        detected += len(found)
+        labelled += len(shapes)
+    precision = matched/detected if detected else 1.0
+    recall = matched/labelled if labelled else 1.0
+    accuracy = 2*precision*recall/(precision+recall) if precision+recall else 0.0
+    times = np.array(times)*1000
+    return {"accuracy": accuracy, "precision": precision, "recall": recall,
+            "mean_ms": float(times.mean()), "p95_ms": float(np.percentile(times, 95))}
+
+def __detections(img):
+    """
+    Detect all the shapes of an image with the current settings.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The grayscale image.
+
+    Returns
+    -------
+    found : list
+        The shape and center of each detection. The partial and unknown shapes are not counted.
+    """
+    _, candidates, detected_list = detect_candidates(img)
+    return [(Shape(value), features.center) for features, value in zip(candidates, detected_list.tolist())
+            if Shape(value) not in IGNORED]
+
+def __match(found, shapes, tolerance):
+    """
+    Count the labelled shapes found. Each detection matches one label at most : the nearest of the same type.
+
+    Parameters
+    ----------
+    found : list
+        The shape and center of each detection.
+    shapes : list
+        The labelled shapes and centers. A center can be None.
+    tolerance : float
+        Largest distance between a labelled center and the detected one, in pixels.
+
+    Returns
+    -------
+    matched : int
+        Number of labelled shapes found.
+    """
+    free = list(found)
+    matched = 0
+    for shape, center in shapes:
+        best = None
+        for i, (detected, position) in enumerate(free):
+            if detected != shape:
+                continue
+            distance = 0.0 if center is None else np.hypot(position[0]-center[0], position[1]-center[1])
+            if distance <= tolerance and (best is None or distance < best[1]):
+                best = (i, distance)
+        if best is not None:
+            del free[best[0]]
+            matched += 1
+    return matched
+
+def __read_recording(path):
+    """
+    Read the amplitude images of a recording.
+
+    Parameters
+    ----------
+    path : str
+        Path of a ring file of FlightRecorder, or a .npz file of its export.
+
+    Returns
+    -------
+    amplitude : numpy.ndarray
+        The amplitude images.
+    """
+    if path.endswith(".npz"):
+        return np.load(path)["amplitude"]
+    from .recorder import read_ring
+    return read_ring(path)["amplitude"]
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Search the detection parameters on a labelled set of frames.")
+    parser.add_argument("dataset", help="JSON file of the labelled frames.")
+    parser.add_argument("-n", "--candidates", type=int, default=200, help="Number of parameter sets tried.")
+    parser.add_argument("--target", type=float, default=0.95, help="Accuracy target (F1 score), between 0 and 1.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes. Default : one per CPU.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of times each frame is processed.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Largest center distance, in pixels.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the draw.")
+    parser.add_argument("--label", nargs="+", default=None, help="Write the dataset from the current detection of these png images, to correct by hand.")
+    parser.add_argument("-o", "--output", default=None, help="Save all the results in this JSON file.")
+    parser.add_argument("--save", default=None, help="Save the chosen parameter set in this settings file.")
+    args = parser.parse_args()
+    if args.label is not None:
+        label_images(args.label, args.dataset)
+        print(len(args.label), "frames labelled in", args.dataset)
+        sys.exit(0)
+
+    try:
+        frames = load_dataset(args.dataset)
+    except (OSError, ValueError, KeyError) as e:
+        print(e)
+        sys.exit(1)
+    candidates = sample(args.candidates, seed=args.seed)
+    start = time.perf_counter()
+    results = tune(frames, candidates, args.workers, args.repeats, args.tolerance)
+    print(len(candidates), "parameter sets on", len(frames), "frames in", round(time.perf_counter()-start, 1), "s")
+    front = pareto_front(results)
+    names = sorted(SEARCH_SPACE)
+    print("{:>9} {:>9} {:>9}  ".format("accuracy", "mean ms", "p95 ms") + " ".join(names))
+    for result in front:
+        print("{:>9.3f} {:>9.3f} {:>9.3f}  ".format(result["accuracy"], result["mean_ms"], result["p95_ms"])
+              + " ".join(str(getattr(result["settings"], name)) for name in names))
+    current = results[0]
+    print("Current settings : accuracy", round(current["accuracy"], 3), ", mean", round(current["mean_ms"], 3), "ms")
+    best = fastest(front, args.target)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump([dict(result, settings=result["settings"].to_dict(), pareto=result in front)
+                       for result in results], f, indent=4)
+    if best is None:
+        print("No parameter set reaches the accuracy target", args.target)
+        sys.exit(1)
+    print("Fastest set with accuracy >=", args.target, ":", round(best["mean_ms"], 3), "ms,",
+          "accuracy", round(best["accuracy"], 3))
+    if args.save is not None:
+        save_settings(best["settings"], args.save)
+        print("Saved in", args.save)
+    sys.exit(0)
@@ -1,153 +1,248 @@
-from tkinter import *
+import sys
 import math
+import time
 import numpy as np
 import socket
+from .tracing import span
+from .settings import get_settings
 
-HOST = "149.201.218.149"
-PORT = 30001
-FORCE_GRIPPER = 40
-OPEN_GRIPPER = 75
-CLOSE_GRIPPER = 45
+def __getattr__(name):
+    """
+    Load the GUI only when it's used, so tkinter is not imported without it.
+    """
+    if name == "GUI_Positions":
+        from .gui import GUI_Positions
+        return GUI_Positions
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
 
-class GUI_Positions:
+def get_object(dic, img_width, img_height, center,z,angle, features=None, robot=None, tracker=None, timestamp=None):
     """
-        GUI Position class is a GUI to declare the position of the robot on the image.
-        It will save the robot position at the top left, top right, 
-        bottom left and bottom right of the camera's view.
-        """
-    def __init__(self):
-        """
-        Initialise the GUI.
-        """
-        self.window = Tk()
-        self.frame = Frame(self.window)
-        self.pos_value={}
-        self.__create_widgets()
-        self.frame.pack(expand=YES)
+    Move the UR3 robot to get the object.
 
-    @property
-    def get_pos(self):
-        """
-        Get the robot position.
+    If the object's geometry is given, the center and the angle are taken from it.\n
+    If a tracker is given, the object is moving : it's taken where it will be at the grasp.
 
-        Returns
-        -------
-        pos_value : dict
-            A dictionnary that contains the positions. e.g 'Top Left': ['116', '-319']
-        """
-        return self.pos_value
-    
-    def __create_widgets(self):
-        """
-        Create widgets.
-        """
-        self.__create_pos_box("Top Left").pack()
-        self.__create_pos_box("Top Right").pack()
-        self.__create_pos_box("Bottom Left").pack()
-        self.__create_pos_box("Bottom Right").pack()
-        val = self.__create_pos(self.frame,"z : ",-50,500)
-        self.pos_value["Z"] = [val]
-        Button(self.frame,text="Validate",command=self.window.quit,width=15).pack()
-
-    def __create_pos_box(self,title):
-        """
-        Create widget for each positions.
+    Parameters
+    ----------
+    dic : dict
+        Dictionnary of positions.
+    img_width : int
+        Width size of the image. In pixel.
+    img_height : int
+        Height size of the image. In pixel.
+    center : list
+        Object's center. In pixel.
+    z : float
+        Object's height.
+    angle : float
+        Angle of rotation of the object.
+    features : ContourFeatures
+        Object's geometry, given by shape_recognition.
+    robot : Robot or ExecutionManager
+        Open connection to the robot. None to connect only for this object.
+    tracker : ConveyorTracker
+        Velocity of the object and robot's latency. None if the object doesn't move.
+    timestamp : float
+        Time of the frame, in seconds. None for now.
+    """
+    if features is not None:
+        center = features.center
+        angle = features.angle
+    with span("transform"):
+        x, y = object_position(dic,img_width,img_height,center)
+        if tracker is not None:
+            x, y = tracker.predict((x, y), time.time() if timestamp is None else timestamp)
+    with span("program"):
+        output = build_program(dic,x,y,z,angle, None if robot is None else robot.next_notify())
+    with span("send"):
+        if robot is None:
+            __send_once(output)
+        else:
+            robot.send(output)
 
+def object_position(dic, img_width, img_height, center):
+    """
+    Get the position of the object for the robot, from its position on the image.
+
+    Parameters
+    ----------
+    dic : dict
+        Dictionnary of positions.
+    img_width : int
+        Width size of the image. In pixel.
+    img_height : int
+        Height size of the image. In pixel.
+    center : list
+        Object's center. In pixel.
+
+    Returns
+    -------
+    x : float
+        Distance from top left X to the center X position.
+    y : float
+        Distance from top left Y to the center Y position.
+    """
+    return __calcul_positions(dic,img_width,img_height,center)
+
+def build_program(dic, x, y, z, angle, notify=None):
+    """
+    Get the program to get the object.
+
+    The object is held after the lift. If the settings have a drop-off pose, out of the camera's field of view,
+    the object is taken there and released.\n
+    If notify is given, the program reports its progress on a socket, one line per step, followed by the program's ID :\n
+    started : the program runs.\n
+    cleared : the arm is at the drop-off pose, out of the camera's field of view. The release follows.
+    Without drop-off pose, it's reported with done.\n
+    done : the program is finished.
+
+    Parameters
+    ----------
+    dic : dict
+        Dictionnary of positions.
+    x : float
+        Delta X. Distance from Top left X and center X.
+    y : float
+        Delta y. Distance from Top left y and center y.
+    z : float
+        The object's height.
+    angle : float
+        Angle of rotation of the object.
+    notify : tuple
+        Address (host, port) of the computer, as seen by the robot, and the program's ID (host, port, id).
+        None for no report.
+
+    Returns
+    -------
+    output : str
+        The program to send to the robot.
+    """
+    output = __ur3_init(dic)
+    output +=__ur3_notify(notify, "started")
+    output +=__ur3_move(x,y,z+250,angle, False) #go to the top of the object and open the grip
+    output +=__ur3_move(0,0,z,angle, False) #go down to grab the object
+    output +=__ur3_move(0,0,z,angle, True)    #close the grip to get the object
+    output +=__ur3_move(0,0,z+250,angle, True) #go up
+    if get_settings().drop_pose is not None:
+        output +=__ur3_drop() #leave the camera's field of view
+        output +=__ur3_notify(notify, "cleared")
+        output +=__ur3_release() #drop the object
+    else:
+        output +=__ur3_notify(notify, "cleared")
+    output +=__ur3_notify(notify, "done")
+    output +="""end\n"""
+    return output
+
+class Robot:
+    """
+    Connection to the robot, kept open between the programs.
+
+    If the connection is lost, it's opened again at the next program.
+    """
+    def __init__(self, host=None, port=None, timeout=5.0):
+        """
+        Create the connection. It's opened at the first program.
 
         Parameters
         ----------
-        title : str
-            Title's widget.
+        host : str
+            Robot's IP. None for the robot_host of the settings, read at each connection.
+        port : int
+            Robot's port. None for the robot_port of the settings, read at each connection.
+        timeout : float
+            Timeout to connect and send, in seconds.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sent = 0
+        self.reconnects = 0
+        self.sock = None
+        self.notify = None #address the programs report their progress to. None for no report
 
-        Returns
-        -------
-        frame_pos : tkinter.Frame
-            The frame that contains the label and 2 box for x and y position.
+    @property
+    def connected(self):
         """
-        frame_pos = Frame(self.frame)
-        label_title = Label(frame_pos,text=title)
-        label_title.pack()
-        x,y = self.__create_xy(frame_pos)
-        self.pos_value[title]= [x,y]
-        return frame_pos
-
-    def __create_xy(self,frame):
+        bool : True if the connection is open.
         """
-        Create 2 box. One for x another for y.
-        Spinbox can have a value from -540 to 540.
-        To get it I moved the robot as far as possible and I took the values.
+        return self.sock is not None
 
-        Parameters
-        ----------
-        frame : tkinter.Frame
-            Frame to put the widget.
+    def next_notify(self):
+        """
+        Get the address the next program reports its progress to.
 
         Returns
         -------
-        x : tkinter.Spinbox
-            Spinbox with the selected x value
-        y : tkinter.Spinbox
-            Spinbox with the selected y value
+        notify : tuple
+            The notify attribute. None for no report.
         """
-        frame_xy = Frame(frame)
-        x = self.__create_pos(frame_xy,"x : ",-540,540)
-        y = self.__create_pos(frame_xy,"y : ",-540,540)
-        frame_xy.pack()
-        return x, y
+        return self.notify
 
-    def __create_pos(self,frame,text,minV,maxV):
+    def connect(self):
+        """
+        Open the connection, if it's not open.
         """
-        Create a spinbox with a minimal and maximale value.
+        if self.sock is None:
+            settings = get_settings()
+            host = settings.robot_host if self.host is None else self.host
+            port = settings.robot_port if self.port is None else self.port
+            self.sock = socket.create_connection((host, port), self.timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, program):
+        """
+        Send a program to the robot.
+
+        The robot sends its state on the same connection. It's read and ignored, so the buffers never fill.
 
         Parameters
         ----------
-        frame : tkinter.Frame
-            Frame to put the widget.
-        text : str
-            Title of the box
-        minV : int
-            Minimal value for a position.
-        maxV : int
-            Maximal value for a position.
-
-        Returns
-        -------
-        num : tkinter.Spinbox
-            Spinbox. The value is in mm.
+        program : str
+            The program, e.g given by build_program.
         """
-        frame_entry_pos = Frame(frame)
-        lab = Label(frame_entry_pos,text=text)
-        num = Spinbox(frame_entry_pos,from_=minV, to=maxV)
-        num.delete(0,END)
-        num.insert(0,0)
-        lab.grid(row = 0, column = 0)
-        num.grid(row = 0, column = 1)
-        Label(frame_entry_pos,text=" mm").grid(row = 0, column = 2)
-        frame_entry_pos.pack()
+        data = program.encode('utf-8')
+        for attempt in range(2):
+            try:
+                self.connect()
+                self.__drain()
+                self.sock.sendall(data)
+                self.sent += 1
+                return
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+                self.reconnects += 1
 
-        return num 
+    def close(self):
+        """
+        Close the connection.
+        """
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
 
-def get_object(dic, img_width, img_height, center,z,angle):
-    """
-    Move the UR3 robot to get the object.
+    def __drain(self):
+        """
+        Read and ignore what the robot sent.
 
-    Parameters
-    ----------
-    dic : dict
-        Dictionnary of positions.
-    img_width : int
-        Width size of the image. In pixel.
-    img_height : int
-        Height size of the image. In pixel.
-    center : list
-        Object's center. In pixel.
-    z : float
-        Object's height.
-    angle : float
-        Angle of rotation of the object.
-    """
-    x, y = __calcul_positions(dic,img_width,img_height,center)
-    __goto_object(dic,x,y,z,angle)
+        Raises
+        ------
+        ConnectionError
+            If the robot closed the connection.
+        """
+        self.sock.setblocking(False)
+        try:
+            while True:
+                if not self.sock.recv(65536):
+                    raise ConnectionError("The robot closed the connection.")
+        except BlockingIOError:
+            pass
+        finally:
+            self.sock.settimeout(self.timeout)
 
 def __spin_to_val(arr):
     """
@@ -235,29 +330,18 @@ def __get_pixel_metric_value(dic_pos, img_width, img_height):
         raise ValueError("The positions don't match the image. There's a bad ratio.") #It has to be the same ratio than the camera
     return pixel_size
 
-def __goto_object(dic, x, y, z, angle):
+def __send_once(output):
     """
-    Move the robot to get the object.
-    
+    Connect to the robot, send the program and disconnect.
+
     Parameters
     ----------
-    dic : dict
-        Dictionnary of positions.
-    x : float
-        Delta X. Distance from Top left X and center X.
-    y : float
-        Delta y. Distance from Top left y and center y.
-    z : float
-        The object's height.
+    output : str
+        The program to send to the robot.
     """
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((HOST, PORT))
-    output = __ur3_init(dic)        
-    output +=__ur3_move(x,y,z+250,angle, False) #go to the top of the object and open the grip
-    output +=__ur3_move(0,0,z,angle, False) #go down to grab the object
-    output +=__ur3_move(0,0,z,angle, True)    #close the grip to get the object
-    output +=__ur3_move(0,0,z+250,angle, True) #go up
-    output +="""end\n"""
+    settings = get_settings()
+    s.connect((settings.robot_host, settings.robot_port))
     s.sendall(output.encode('utf-8'))
     s.close()
 
@@ -279,13 +363,14 @@ def __ur3_init(dic):
     # from https://github.com/sharathrjtr/ur10_rg2_ros/blob/master/ur_modern_driver/src/ur_driver.cpp
     x = int(dic.get("Top Left")[0])
     y = int(dic.get("Top Left")[1])
+    settings = get_settings()
     output = """def urProf():\n
     movej([0,-1.5708,0,-1.5708,0,0],a=1,v=1)\n
     movej([0,-1.36,0.93,-2.72,0,0],a=1,v=1)\n
     global init_x = """+str(x/1000)+"""\n
     global init_y = """+str(y/1000)+"""\n
     movej(p[init_x,init_y,0.25,0.0001,-3.166,-0.04],a=1,v=1)\n
-    def set_rg(width="""+str(OPEN_GRIPPER)+""", force="""+str(FORCE_GRIPPER)+"""):\n
+    def set_rg(width="""+str(settings.open_gripper)+""", force="""+str(settings.force_gripper)+"""):\n
         local input = floor(width)*4 + floor(force/2)*4*111\n
         local msb=65536\n
         local i=0\n
@@ -345,19 +430,80 @@ def __ur3_move(dx, dy, z, angle, close_grip):
     pos[1]=pos[1]+y\n
     pos[2]=z\n
     pos[3]=angle\n"""
-    grip_val = OPEN_GRIPPER
+    grip_val = get_settings().open_gripper
     if(close_grip):
-        grip_val = CLOSE_GRIPPER
+        grip_val = get_settings().close_gripper
     output+="""set_rg("""+str(grip_val)+""")\n
     movej(pos,a=1,v=1)\n"""
     return output
 
+def __ur3_drop():
+    """
+    Move the robot to the drop-off pose of the settings.
+    Use movej.
+
+    Returns
+    -------
+    output : str
+        The message to send to the robot.
+    """
+    pose = ",".join(str(joint) for joint in get_settings().drop_pose)
+    output = """movej(["""+pose+"""],a=1,v=1)\n
+    """
+    return output
+
+def __ur3_release():
+    """
+    Open the grip to release the object.
+
+    Returns
+    -------
+    output : str
+        The message to send to the robot.
+    """
+    output = """set_rg("""+str(get_settings().open_gripper)+""")\n
+    """
+    return output
+
+def __ur3_notify(notify, step):
+    """
+    Report a step of the program to the computer.
+
+    The socket is opened at the first step and closed at the last one.
+
+    Parameters
+    ----------
+    notify : tuple
+        Address (host, port) of the computer, and the program's ID (host, port, id). None for no report.
+    step : str
+        started, cleared or done.
+
+    Returns
+    -------
+    output : str
+        The message to send to the robot. Empty if there's no report.
+    """
+    if notify is None:
+        return ""
+    output = ""
+    if step == "started":
+        output += """socket_open(\""""+str(notify[0])+"""\", """+str(int(notify[1]))+""", "pc")\n
+    """
+    line = step if len(notify) < 3 else step + " " + str(int(notify[2]))
+    output += """socket_send_line(\""""+line+"""\", "pc")\n
+    """
+    if step == "done":
+        output += """socket_close("pc")\n
+    """
+    return output
+
 if __name__=="__main__":
     """
     Main program. If we put argument, the GUI will be displayed to specify the positions.
     If no argument are passed, it will use a predefine dictionnary of positions.
     """
     if len(sys.argv) > 1:
+        from .gui import GUI_Positions
         app = GUI_Positions()
         app.window.mainloop()
         
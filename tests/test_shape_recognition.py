@@ -0,0 +1,16 @@
+import cv2
+import numpy as np
+from shape_processing_ifm_ur3.Shape import Shape
+from shape_processing_ifm_ur3.shape_recognition import detect
+
+def test_blocked_seeds():
+    """
+    Both seeds of fill-holes are blocked : (0,0) is on the edge of a bright corner, and (width/2,10) is inside
+    the rectangle. The rectangle is then a hole of the background, and must still be found.
+    """
+    img = np.full((172, 224), 40, np.uint8)
+    img[:4, :4] = 200
+    cv2.rectangle(img, (85, 4), (140, 40), 210, -1)
+    detection = detect(Shape.RECTANGLE, img)
+    assert detection.index is not None
+    assert np.allclose(detection.center, (112.0, 21.5), atol=1.0)